@@ -0,0 +1,50 @@
+"""Add job search indexes
+
+Revision ID: 3f1c2b9a7d41
+Revises: 
+Create Date: 2026-10-16 09:12:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2b9a7d41'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ("title", "location", "requirements")
+SEARCH_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, coalesce(title, '') || ' ' || "
+    "coalesce(location, '') || ' ' || coalesce(requirements, ''))"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_job_search_document",
+        "job",
+        [sa.text(SEARCH_DOCUMENT)],
+        postgresql_using="gin",
+        if_not_exists=True,
+    )
+    for column in SEARCH_COLUMNS:
+        op.create_index(
+            f"ix_job_{column}_trgm",
+            "job",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f"ix_job_{column}_trgm", table_name="job", if_exists=True)
+    op.drop_index("ix_job_search_document", table_name="job", if_exists=True)
@@ -0,0 +1,38 @@
+"""Add keyset pagination indexes
+
+Revision ID: 5d7a9c1e3f20
+Revises: 8c2e4f6a1b93
+Create Date: 2026-10-17 09:11:48.207613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d7a9c1e3f20'
+down_revision: Union[str, None] = '8c2e4f6a1b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_job_created_at_id", "job", ["created_at", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_job_application_created_at_id", "job_application",
+        ["created_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_job_application_created_at_id", table_name="job_application",
+        if_exists=True,
+    )
+    op.drop_index("ix_job_created_at_id", table_name="job", if_exists=True)
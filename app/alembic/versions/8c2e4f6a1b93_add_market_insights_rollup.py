@@ -0,0 +1,47 @@
+"""Add market insights rollup
+
+Revision ID: 8c2e4f6a1b93
+Revises: 3f1c2b9a7d41
+Create Date: 2026-10-17 09:04:12.381950
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e4f6a1b93'
+down_revision: Union[str, None] = '3f1c2b9a7d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "market_insights_rollup",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("location", sa.String(length=255), nullable=False),
+        sa.Column("job_type", sa.String(length=50), nullable=False),
+        sa.Column("workplace_type", sa.String(length=50), nullable=False),
+        sa.Column("status", sa.String(length=50), nullable=False),
+        sa.Column("salary_bucket", sa.Integer(), nullable=False),
+        sa.Column("client_id", sa.Uuid(), nullable=False),
+        sa.Column("job_count", sa.Integer(), nullable=False),
+        sa.Column("salary_sum", sa.Numeric(), nullable=False),
+        sa.Column("salary_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["client_id"], ["client_profile.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "location", "job_type", "workplace_type", "status",
+            "salary_bucket", "client_id",
+            name="uq_market_insights_rollup_segment",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("market_insights_rollup")
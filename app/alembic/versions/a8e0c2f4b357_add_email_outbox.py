@@ -0,0 +1,47 @@
+"""Add email outbox
+
+Revision ID: a8e0c2f4b357
+Revises: f5d7e9a1c246
+Create Date: 2026-10-17 10:58:06.291473
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e0c2f4b357'
+down_revision: Union[str, None] = 'f5d7e9a1c246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("email_to", sa.String(length=255), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("html_content", sa.String(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_email_outbox_status_next_attempt_at",
+        "email_outbox",
+        ["status", "next_attempt_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_email_outbox_status_next_attempt_at", table_name="email_outbox"
+    )
+    op.drop_table("email_outbox")
@@ -0,0 +1,39 @@
+"""Add job market rollup segment index
+
+Revision ID: b1d3f5a7c960
+Revises: a8e0c2f4b357
+Create Date: 2026-10-17 11:32:45.806127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1d3f5a7c960'
+down_revision: Union[str, None] = 'a8e0c2f4b357'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_job_market_rollup_segment",
+        "job",
+        [
+            "client_id",
+            "job_type",
+            "workplace_type",
+            "status",
+            sa.text("coalesce(location, '')"),
+        ],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_job_market_rollup_segment", table_name="job", if_exists=True
+    )
@@ -0,0 +1,47 @@
+"""Weight job search document columns
+
+Revision ID: b4f81d2c6e57
+Revises: 5d7a9c1e3f20
+Create Date: 2026-10-17 09:26:03.845129
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f81d2c6e57'
+down_revision: Union[str, None] = '5d7a9c1e3f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, coalesce(title, '') || ' ' || "
+    "coalesce(location, '') || ' ' || coalesce(requirements, ''))"
+)
+# Title weighted A, location and requirements B
+WEIGHTED_SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(requirements, '')), 'B'))"
+)
+
+
+def _create_search_document_index(document: str) -> None:
+    op.drop_index("ix_job_search_document", table_name="job", if_exists=True)
+    op.create_index(
+        "ix_job_search_document",
+        "job",
+        [sa.text(document)],
+        postgresql_using="gin",
+    )
+
+
+def upgrade() -> None:
+    _create_search_document_index(WEIGHTED_SEARCH_DOCUMENT)
+
+
+def downgrade() -> None:
+    _create_search_document_index(SEARCH_DOCUMENT)
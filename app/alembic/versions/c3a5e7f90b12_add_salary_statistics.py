@@ -0,0 +1,56 @@
+"""Add salary statistics
+
+Revision ID: c3a5e7f90b12
+Revises: b4f81d2c6e57
+Create Date: 2026-10-17 09:41:27.660384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a5e7f90b12'
+down_revision: Union[str, None] = 'b4f81d2c6e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "salary_statistics",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("title", sa.String(length=255), nullable=False),
+        sa.Column("location", sa.String(length=255), nullable=False),
+        sa.Column("job_type", sa.String(length=50), nullable=False),
+        sa.Column("sample_size", sa.Integer(), nullable=False),
+        sa.Column("mean", sa.Numeric(), nullable=False),
+        sa.Column("p10", sa.Numeric(), nullable=False),
+        sa.Column("p25", sa.Numeric(), nullable=False),
+        sa.Column("median", sa.Numeric(), nullable=False),
+        sa.Column("p75", sa.Numeric(), nullable=False),
+        sa.Column("p90", sa.Numeric(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "title", "location", "job_type",
+            name="uq_salary_statistics_segment",
+        ),
+    )
+    op.create_index(
+        "ix_job_salary_segment",
+        "job",
+        [
+            sa.text("lower(trim(title))"),
+            sa.text("coalesce(location, '')"),
+            "job_type",
+        ],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_salary_segment", table_name="job", if_exists=True)
+    op.drop_table("salary_statistics")
@@ -0,0 +1,30 @@
+"""Add market insights salary digest
+
+Revision ID: d9b1c3e5f724
+Revises: c3a5e7f90b12
+Create Date: 2026-10-17 09:58:14.093517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b1c3e5f724'
+down_revision: Union[str, None] = 'c3a5e7f90b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled by app/refresh_market_insights.py, run from prestart.sh
+    op.add_column(
+        "market_insights_rollup",
+        sa.Column("salary_digest", sa.JSON(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("market_insights_rollup", "salary_digest")
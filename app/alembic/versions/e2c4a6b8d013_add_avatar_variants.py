@@ -0,0 +1,31 @@
+"""Add avatar variants
+
+Revision ID: e2c4a6b8d013
+Revises: d9b1c3e5f724
+Create Date: 2026-10-17 10:24:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c4a6b8d013'
+down_revision: Union[str, None] = 'd9b1c3e5f724'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables with an avatar, see app/images.py for the variants
+AVATAR_TABLES = ("client_profile", "candidate_profile")
+
+
+def upgrade() -> None:
+    for table in AVATAR_TABLES:
+        op.add_column(table, sa.Column("avatar_variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in AVATAR_TABLES:
+        op.drop_column(table, "avatar_variants")
@@ -0,0 +1,41 @@
+"""Add candidate resume skill
+
+Revision ID: f5d7e9a1c246
+Revises: e2c4a6b8d013
+Create Date: 2026-10-17 10:41:52.730619
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5d7e9a1c246'
+down_revision: Union[str, None] = 'e2c4a6b8d013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "candidate_resume_skill",
+        sa.Column("candidate_id", sa.Uuid(), nullable=False),
+        sa.Column("skill", sa.String(length=255), nullable=False),
+        sa.Column("occurrences", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["candidate_id"], ["candidate_profile.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("candidate_id", "skill"),
+    )
+    op.create_index(
+        "ix_candidate_resume_skill_skill", "candidate_resume_skill", ["skill"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_candidate_resume_skill_skill", table_name="candidate_resume_skill"
+    )
+    op.drop_table("candidate_resume_skill")
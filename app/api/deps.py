@@ -1,16 +1,23 @@
-from collections.abc import Generator
-from typing import Annotated, Union
+import uuid
+from collections.abc import AsyncGenerator, Generator
+from itertools import chain
+from typing import Annotated, Optional, Union
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SASession, make_transient_to_detached
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import async_engine, async_replicas, engine
+from app.core.replicas import RoutingSession
 from app.models import Client, Candidate
 from app.api.schemas.utils import TokenPayload
 
@@ -27,30 +34,142 @@ def get_db() -> Generator[Session, None, None]:
         yield session
 
 
+# Async database dependency, for async routes. Objects stay loaded after
+# commit since lazy loads aren't possible outside of the session's awaits.
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+# Read only database dependency, reading from a replica when configured.
+# Sessions switch to the primary once they write.
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        primary=async_engine.sync_engine,
+        replicas=async_replicas,
+    ) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-# Get current user function
-def get_current_user(session: SessionDep, token: TokenDep) -> Union[Client, Candidate]:
+def decode_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
 
-    user = session.get(Candidate, token_data.sub) or session.get(Client, token_data.sub)    
+
+# Authenticated users by token subject, as detached snapshots merged into
+# each request's session without a query
+principal_cache = TTLCache(settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+USER_TYPES = {"candidate": Candidate, "client": Client}
+
+
+def _principal_models(token_data: TokenPayload) -> tuple:
+    """
+    Tables to look the token's subject up in, both for tokens issued
+    before the user type was added to them.
+    """
+    model = USER_TYPES.get(token_data.user_type)
+    return (model,) if model else (Candidate, Client)
+
+
+def _principal_id(token_data: TokenPayload) -> uuid.UUID:
+    try:
+        return uuid.UUID(token_data.sub)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+
+
+def _principal_snapshot(user: Union[Client, Candidate]) -> Union[Client, Candidate]:
+    snapshot = type(user)(**user.model_dump())
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+# Get current user function
+def get_current_user(session: SessionDep, token: TokenDep) -> Union[Client, Candidate]:
+    token_data = decode_token(token)
+    user_id = _principal_id(token_data)
+
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return session.merge(cached, load=False)
+
+    user = None
+    for model in _principal_models(token_data):
+        user = user or session.get(model, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    principal_cache.set(user_id, _principal_snapshot(user))
     return user
 
 
+async def get_current_user_async(
+    session: AsyncSessionDep, token: TokenDep
+) -> Union[Client, Candidate]:
+    token_data = decode_token(token)
+    user_id = _principal_id(token_data)
+
+    cached = principal_cache.get(user_id)
+    if cached is not None:
+        return await session.merge(cached, load=False)
+
+    user = None
+    for model in _principal_models(token_data):
+        user = user or await session.get(model, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    principal_cache.set(user_id, _principal_snapshot(user))
+    return user
+
+
+@event.listens_for(SASession, "after_flush")
+def _track_principal_changes(session, flush_context) -> None:
+    changed = chain(session.dirty, session.deleted)
+    user_ids = {
+        instance.id for instance in changed
+        if isinstance(instance, (Candidate, Client))
+    }
+    if user_ids:
+        session.info.setdefault("changed_principals", set()).update(user_ids)
+
+
+@event.listens_for(SASession, "after_commit")
+def _invalidate_principals(session) -> None:
+    for user_id in session.info.pop("changed_principals", ()):
+        principal_cache.invalidate(user_id)
+
+
 CurrentUser = Annotated[Union[Client, Candidate], Depends(get_current_user)]
+AsyncCurrentUser = Annotated[
+    Union[Client, Candidate], Depends(get_current_user_async)
+]
+
+
+def as_candidate(user: Union[Client, Candidate]) -> Optional[Candidate]:
+    return user if isinstance(user, Candidate) else None
+
+
+def as_client(user: Union[Client, Candidate]) -> Optional[Client]:
+    return user if isinstance(user, Client) else None
 
 
 # Superuser verification (if applicable for clients)
@@ -3,18 +3,24 @@ from typing import Any
 from datetime import timedelta
 
 from fastapi import (
-    APIRouter, Depends, HTTPException,
-    File, UploadFile, Form
+    APIRouter, BackgroundTasks, Depends, HTTPException,
+    File, UploadFile, Form, Request
 )
 from sqlmodel import func, select
 
-from app import crud
+from app import crud, crud_async
+from app.images import process_avatar
+from app.resumes import process_resume
 from app.utils import save_file, parse_json_string_field
 from app.core import security
 from app.core.config import settings
+from app.core.rate_limit import check_login_rate_limit
 from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
     CurrentUser,
     SessionDep,
+    as_candidate,
     get_current_active_superuser,
 )
 from app.models import Candidate
@@ -28,7 +34,7 @@ router = APIRouter()
 
 @router.post("/register", response_model=Token)
 async def register_candidate(
-    session: SessionDep,
+    session: AsyncSessionDep,
     candidate_in: CandidateCreate
 ) -> Token:
     """
@@ -36,8 +42,8 @@ async def register_candidate(
     """
     # Check if the email is already registered
     existing_user_email = (
-        crud.get_client_by_email(session=session, email=candidate_in.email) or
-        crud.get_candidate_by_email(session=session, email=candidate_in.email)
+        await crud_async.get_client_by_email(session=session, email=candidate_in.email) or
+        await crud_async.get_candidate_by_email(session=session, email=candidate_in.email)
     )
     if existing_user_email:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -45,13 +51,13 @@ async def register_candidate(
     # Check if the phone number is already registered
     if candidate_in.phone_number:
         existing_phone_number = (
-            crud.get_client_by_phone_number(session=session, phone_number=candidate_in.phone_number) or
-            crud.get_candidate_by_phone_number(session=session, phone_number=candidate_in.phone_number)
+            await crud_async.get_client_by_phone_number(session=session, phone_number=candidate_in.phone_number) or
+            await crud_async.get_candidate_by_phone_number(session=session, phone_number=candidate_in.phone_number)
         )
         if existing_phone_number:
             raise HTTPException(status_code=400, detail="Phone number already registered")
 
-    candidate = crud.create_candidate(session=session, candidate_in=candidate_in)
+    candidate = await crud_async.create_candidate(session=session, candidate_in=candidate_in)
 
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -59,21 +65,26 @@ async def register_candidate(
 
     return Token(
         access_token=security.create_access_token(
-            candidate.id, expires_delta=access_token_expires
+            candidate.id, expires_delta=access_token_expires,
+            user_type="candidate"
         )
     )
 
 
 @router.post("/login", response_model=Token)
-def login_candidate(candidate_in: CandidateLogin, session: SessionDep) -> Any:
+async def login_candidate(
+    request: Request, candidate_in: CandidateLogin, session: AsyncSessionDep
+) -> Any:
     """
     Log in a candidate and return a token.
     """
+    await check_login_rate_limit(request, candidate_in.email)
+
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
 
-    candidate = crud.authenticate_candidate(
+    candidate = await crud_async.authenticate_candidate(
         session=session, email=candidate_in.email, password=candidate_in.password
     )
     if not candidate:
@@ -83,7 +94,8 @@ def login_candidate(candidate_in: CandidateLogin, session: SessionDep) -> Any:
 
     return Token(
         access_token=security.create_access_token(
-            candidate.id, expires_delta=access_token_expires
+            candidate.id, expires_delta=access_token_expires,
+            user_type="candidate"
         )
     )
 
@@ -110,14 +122,16 @@ def login_social_candidate(session: SessionDep, login_request: SocialLoginBase)
     if is_new_user:
         return SocialLoginToken(
             access_token=security.create_access_token(
-                str(candidate.id), expires_delta=access_token_expires
+                str(candidate.id), expires_delta=access_token_expires,
+                user_type="candidate"
             ),
             is_new_user=is_new_user
         )
     else:
         return Token(
             access_token=security.create_access_token(
-                str(candidate.id), expires_delta=access_token_expires
+                str(candidate.id), expires_delta=access_token_expires,
+                user_type="candidate"
             )
         )
 
@@ -127,7 +141,7 @@ def get_current_candidate(session: SessionDep, current_user: CurrentUser) -> Any
     """
     Get the currently logged-in candidate's profile.
     """
-    candidate = crud.get_candidate_by_email(session=session, email=current_user.email)
+    candidate = as_candidate(current_user)
     if not candidate:
         raise HTTPException(
             status_code=404, detail="Candidate profile not found")
@@ -151,8 +165,9 @@ def get_candidate_by_id(
 
 @router.patch("/me", response_model=CandidatePublic)
 async def update_current_candidate(
-    session: SessionDep,
-    current_user: CurrentUser,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    background_tasks: BackgroundTasks,
     full_name: Optional[str] = Form(None),
     phone_number: Optional[str] = Form(None),
     location: Optional[str] = Form(None),
@@ -190,9 +205,7 @@ async def update_current_candidate(
     """
     Update the currently logged-in candidate's profile.
     """
-    candidate = crud.get_candidate_by_email(
-        session=session, email=current_user.email
-    )
+    candidate = as_candidate(current_user)
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
@@ -212,9 +225,18 @@ async def update_current_candidate(
             notification_preferences, "notification_preferences")
 
      # Handle file upload
-    avatar = await save_file(candidate.id, avatar, "avatar") if avatar else None
-    resume_url = await save_file(candidate.id, resume_upload, "resumes") if resume_upload else None
-    cover_letter_url = await save_file(candidate.id, cover_letter_upload, "cover_letters") \
+    avatar_file = await save_file(avatar, "avatar") if avatar else None
+    avatar = avatar_file.url if avatar_file else None
+    # Variants of a new avatar are generated once the response is sent
+    new_avatar = avatar_file is not None and (
+        candidate.avatar != avatar or not candidate.avatar_variants
+    )
+    if new_avatar:
+        candidate.avatar_variants = None
+    resume_file = await save_file(resume_upload, "resumes") if resume_upload else None
+    resume_url = resume_file.url if resume_file else None
+    new_resume = resume_file is not None and candidate.resume_upload != resume_url
+    cover_letter_url = (await save_file(cover_letter_upload, "cover_letters")).url \
             if cover_letter_upload else None
 
     candidate_data = {
@@ -257,9 +279,13 @@ async def update_current_candidate(
     filtered_data = {k: v for k, v in candidate_data.items() if v is not None}
     candidate_in = CandidateUpdate(**filtered_data)
 
-    updated_candidate = crud.update_candidate(
+    updated_candidate = await crud_async.update_candidate(
         session=session, db_candidate=candidate, candidate_in=candidate_in
     )
+    if new_avatar:
+        background_tasks.add_task(process_avatar, Candidate, candidate.id, avatar_file.key)
+    if new_resume:
+        background_tasks.add_task(process_resume, candidate.id, resume_file.key)
 
     return updated_candidate
 
@@ -271,7 +297,7 @@ def delete_current_candidate(
     """
     Delete the currently logged-in candidate's profile.
     """
-    candidate = crud.get_candidate_by_email(session=session, email=current_user.email)
+    candidate = as_candidate(current_user)
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
@@ -3,18 +3,23 @@ from typing import Any
 from datetime import timedelta
 
 from fastapi import (
-    APIRouter, Depends, HTTPException,
-    File, UploadFile, Form
+    APIRouter, BackgroundTasks, Depends, HTTPException,
+    File, UploadFile, Form, Request
 )
 from sqlmodel import func, select
 
-from app import crud
+from app import crud, crud_async
+from app.images import process_avatar
 from app.utils import save_file, parse_json_string_field
 from app.core import security
 from app.core.config import settings
+from app.core.rate_limit import check_login_rate_limit
 from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncSessionDep,
     CurrentUser,
     SessionDep,
+    as_client,
     get_current_active_superuser,
 )
 from app.models import Client
@@ -56,21 +61,26 @@ def register_client(client_in: ClientCreate, session: SessionDep) -> Any:
 
     return Token(
         access_token=security.create_access_token(
-            client.id, expires_delta=access_token_expires
+            client.id, expires_delta=access_token_expires,
+            user_type="client"
         )
     )
 
 
 @router.post("/login", response_model=Token)
-def login_client(client_in: ClientLogin, session: SessionDep) -> Any:
+async def login_client(
+    request: Request, client_in: ClientLogin, session: AsyncSessionDep
+) -> Any:
     """
     Log in a client and return a token.
     """
+    await check_login_rate_limit(request, client_in.email)
+
     access_token_expires = timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
 
-    client = crud.authenticate_client(
+    client = await crud_async.authenticate_client(
         session=session, email=client_in.email, password=client_in.password
     )
     if not client:
@@ -80,7 +90,8 @@ def login_client(client_in: ClientLogin, session: SessionDep) -> Any:
 
     return Token(
         access_token=security.create_access_token(
-            client.id, expires_delta=access_token_expires
+            client.id, expires_delta=access_token_expires,
+            user_type="client"
         )
     )
 
@@ -90,7 +101,7 @@ def get_current_client(session: SessionDep, current_user: CurrentUser) -> Any:
     """
     Get the currently logged-in client's profile.
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(status_code=404, detail="Client profile not found")
 
@@ -112,8 +123,9 @@ def get_client_by_id(
 
 @router.patch("/me", response_model=ClientPublic)
 async def update_current_client(
-    session: SessionDep,
-    current_user: CurrentUser,
+    session: AsyncSessionDep,
+    current_user: AsyncCurrentUser,
+    background_tasks: BackgroundTasks,
     company_name: Optional[str] = Form(None),
     avatar: Optional[UploadFile] = File(None),
     industry: Optional[str] = Form(None),
@@ -143,7 +155,7 @@ async def update_current_client(
     """
     Update the currently logged-in client's profile.
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
@@ -159,7 +171,14 @@ async def update_current_client(
             invite_team_member, "invite_team_member")
 
     # Handle file upload
-    avatar = await save_file(client.id, avatar, "avatar") if avatar else None
+    avatar_file = await save_file(avatar, "avatar") if avatar else None
+    avatar = avatar_file.url if avatar_file else None
+    # Variants of a new avatar are generated once the response is sent
+    new_avatar = avatar_file is not None and (
+        client.avatar != avatar or not client.avatar_variants
+    )
+    if new_avatar:
+        client.avatar_variants = None
 
     client_data = {
         "company_name": company_name,
@@ -194,9 +213,11 @@ async def update_current_client(
     filtered_data = {k: v for k, v in client_data.items() if v is not None}
     client_in = ClientUpdate(**filtered_data)
 
-    updated_client = crud.update_client(
+    updated_client = await crud_async.update_client(
         session=session, db_client=client, client_in=client_in
     )
+    if new_avatar:
+        background_tasks.add_task(process_avatar, Client, client.id, avatar_file.key)
 
     return updated_client
 
@@ -208,7 +229,7 @@ def delete_current_client(
     """
     Delete the currently logged-in client's profile.
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
@@ -1,14 +1,20 @@
 import uuid
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Union
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import func, select
 
-from app import crud
-from app.salary_recommendation import calculate_final_salary
+from app import crud, crud_async
+from app.reference_data import reference_data
+from app.salary_recommendation import recommend_salary, recommend_salaries
 from app.api.deps import (
+    AsyncCurrentUser,
+    AsyncReadSessionDep,
+    AsyncSessionDep,
     CurrentUser,
     SessionDep,
+    as_candidate,
+    as_client,
     get_current_active_superuser,
 )
 from app.models import *
@@ -18,6 +24,26 @@ from app.api.schemas.utils import Message
 router = APIRouter()
 
 
+def _candidate_id(current_user: Union[Client, Candidate]) -> Optional[uuid.UUID]:
+    return current_user.id if isinstance(current_user, Candidate) else None
+
+
+def _jobs_public(page: crud.Page, jobs: List[JobPublic]) -> JobsPublic:
+    return JobsPublic(
+        data=jobs, count=page.count, count_mode=page.count_mode,
+        next_cursor=page.next_cursor
+    )
+
+
+def _job_applications_public(
+    page: crud.Page, applications: List[JobApplicationPublic]
+) -> JobApplicationsPublic:
+    return JobApplicationsPublic(
+        data=applications, count=page.count, count_mode=page.count_mode,
+        next_cursor=page.next_cursor
+    )
+
+
 @router.post("/", response_model=JobPublic)
 def create_job(
     session: SessionDep, job_in: JobCreate, current_user: CurrentUser
@@ -25,7 +51,7 @@ def create_job(
     """
     Create a new job (only for clients).
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(
             status_code=403, detail="Only clients can create jobs")
@@ -36,44 +62,55 @@ def create_job(
 
 
 @router.get("/me", response_model=JobsPublic)
-def get_current_client_jobs(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+async def get_current_client_jobs(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser, skip: int = 0, limit: int = 100,
+    cursor: Optional[str] = None, count_mode: CountModeEnum = CountModeEnum.exact
 ) -> Any:
     """
     Get jobs created by the current/logged in client.
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(
             status_code=403, detail="Only clients can access their jobs"
         )
 
-    jobs, count = crud.get_jobs_by_client(
-        session=session, client_id=client.id, skip=skip, limit=limit)
-    return JobsPublic(data=jobs, count=count)
+    page = await crud_async.get_jobs_by_client(
+        session=session, client_id=client.id, skip=skip, limit=limit,
+        cursor=cursor, count_mode=count_mode
+    )
+    jobs = await crud_async.build_jobs_public(session=session, jobs=page.data)
+    return _jobs_public(page, jobs)
 
 
 
 @router.get("/", response_model=JobsPublic)
-def read_jobs(
-    session: SessionDep, current_user: CurrentUser,
-    skip: int = 0, limit: int = 100
+async def read_jobs(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser,
+    skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
 ) -> JobsPublic:
     """
     Retrieve all jobs.
     """
-    jobs, count = crud.get_jobs(session=session, skip=skip, limit=limit)
-    return JobsPublic(data=jobs, count=count)
+    page = await crud_async.get_jobs(
+        session=session, skip=skip, limit=limit, cursor=cursor,
+        count_mode=count_mode
+    )
+    jobs = await crud_async.build_jobs_public(
+        session=session, jobs=page.data, candidate_id=_candidate_id(current_user)
+    )
+    return _jobs_public(page, jobs)
 
 
 @router.get("/{job_id}", response_model=JobPublic)
-def read_job_by_id(
-    job_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+async def read_job_by_id(
+    job_id: uuid.UUID, session: AsyncReadSessionDep, current_user: AsyncCurrentUser
 ) -> Any:
     """
     Get a specific job by id.
     """
-    job = crud.get_job_by_id(session=session, job_id=job_id)
+    job = await crud_async.get_job_by_id(session=session, job_id=job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return JobPublic(**job.dict(), client_details=job.client)
@@ -87,7 +124,7 @@ def update_job(
     """
     Update a job (only for clients).
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(
             status_code=403, detail="Only clients can update jobs")
@@ -112,7 +149,7 @@ def delete_job(
     """
     Delete a job (only for clients).
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(
             status_code=403, detail="Only clients can delete jobs")
@@ -126,70 +163,63 @@ def delete_job(
             status_code=403, detail="You are not authorized to delete this job"
         )
 
-    session.delete(job)
-    session.commit()
+    crud.delete_job(session=session, db_job=job)
     return Message(message="Job deleted successfully")
 
 
 @router.post("/filters/search", response_model=JobsPublic)
-def search_jobs(
-    session: SessionDep, current_user: CurrentUser, filters: JobSearch
+async def search_jobs(
+    session: AsyncReadSessionDep, primary_session: AsyncSessionDep,
+    current_user: AsyncCurrentUser, filters: JobSearch
 ) -> Any:
     """
     Search for jobs based on multiple filters.
     """
-    jobs, count = crud.search_jobs(
+    page = await crud_async.search_jobs(
         session=session,
         filters=filters,
     )
-    jobs = [
-        JobPublic(
-            **job.dict(),
-            client_details=job.client,
-            application_status=crud.get_job_applications_status(
-                session=session, candidate_id=current_user.id, job_id=job.id
-            )
-        ) for job in jobs
-    ]
-    return JobsPublic(data=jobs, count=count)
+    # The caller's application statuses come from the primary, a replica
+    # could miss an application they just made
+    jobs = await crud_async.build_jobs_public(
+        session=primary_session, jobs=page.data,
+        candidate_id=_candidate_id(current_user)
+    )
+    return _jobs_public(page, jobs)
 
 
 @router.get("/me/matches", response_model=JobsPublic)
-def get_matching_jobs(
-    session: SessionDep, current_user: CurrentUser,
-    skip: int = 0, limit: int = 100
+async def get_matching_jobs(
+    session: AsyncSessionDep, current_user: AsyncCurrentUser,
+    skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
 ) -> Any:
     """
     Get job matches for current/logged in candidate
     """
-    candidate = crud.get_candidate_by_email(session=session, email=current_user.email)
+    candidate = as_candidate(current_user)
     if not candidate:
         raise HTTPException(
             status_code=403, detail="Only candidates can view their job matches")
 
-    jobs, count = crud.get_matching_jobs_for_candidate(
-        session=session, candidate=candidate, skip=skip, limit=limit
+    page = await crud_async.get_matching_jobs_for_candidate(
+        session=session, candidate=candidate, skip=skip, limit=limit,
+        cursor=cursor, count_mode=count_mode
+    )
+    jobs = await crud_async.build_jobs_public(
+        session=session, jobs=page.data, candidate_id=candidate.id
     )
-    jobs = [
-        JobPublic(
-            **job.dict(),
-            client_details=job.client,
-            application_status=crud.get_job_applications_status(
-                session=session, candidate_id=current_user.id, job_id=job.id
-            )
-        ) for job in jobs
-    ]
-    return JobsPublic(data=jobs, count=count)
+    return _jobs_public(page, jobs)
 
 
 @router.post("/filters/insights", response_model=MarketInsightsResponse)
-def get_market_insights(
-    session: SessionDep, current_user: CurrentUser, filters: JobInsightsRequest
+async def get_market_insights(
+    session: AsyncReadSessionDep, current_user: AsyncCurrentUser, filters: JobInsightsRequest
 ) -> MarketInsightsResponse:
     """
     Get market insights based on job filters.
     """
-    return crud.get_market_insights(session=session, filters=filters)
+    return await crud_async.get_market_insights(session=session, filters=filters)
 
 
 ##################################################################
@@ -205,7 +235,7 @@ def apply_to_job(
     """
     Apply to a job (only for candidates).
     """
-    candidate = crud.get_candidate_by_email(session=session, email=current_user.email)
+    candidate = as_candidate(current_user)
     if not candidate:
         raise HTTPException(
             status_code=403, detail="Only candidates can apply to jobs")
@@ -226,58 +256,45 @@ def apply_to_job(
 @router.get("/applications/all", response_model=JobApplicationsPublic)
 def read_job_applications(
     session: SessionDep, current_user: CurrentUser,
-    skip: int = 0, limit: int = 100
+    skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
 ) -> Any:
     """
     Retrieve all job applications.
     """
-    applications, count = crud.get_job_applications(
-        session=session, skip=skip, limit=limit
+    page = crud.get_job_applications(
+        session=session, skip=skip, limit=limit, cursor=cursor,
+        count_mode=count_mode
+    )
+    applications = crud.build_job_applications_public(
+        page.data, with_candidate=False
     )
-    applications = [
-        JobApplicationPublic(
-            **app.dict(),
-            job_details=JobPublic(
-                **app.job.dict(),
-                client_details=app.job.client
-            )
-        )
-        for app in applications
-    ]
 
-    return JobApplicationsPublic(data=applications, count=count)
+    return _job_applications_public(page, applications)
 
 
 @router.get("/applications/me", response_model=JobApplicationsPublic)
 def get_my_job_applications(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100,
+    cursor: Optional[str] = None, count_mode: CountModeEnum = CountModeEnum.exact
 ) -> Any:
     """
     Get all applications submitted by the current/logged-in candidate.
     """
-    candidate = crud.get_candidate_by_email(session=session, email=current_user.email)
+    candidate = as_candidate(current_user)
     if not candidate:
         raise HTTPException(
             status_code=403, detail="Only candidates can view their applications"
         )
 
-    applications, count = crud.get_job_applications_by_candidate_id(
-        session=session, candidate_id=candidate.id, skip=skip, limit=limit
+    page = crud.get_job_applications_by_candidate_id(
+        session=session, candidate_id=candidate.id, skip=skip, limit=limit,
+        cursor=cursor, count_mode=count_mode
     )
 
-    applications = [
-        JobApplicationPublic(
-            **app.dict(),
-            candidate_details=app.candidate,
-            job_details=JobPublic(
-                **app.job.dict(),
-                client_details=app.job.client
-            )
-        )
-        for app in applications
-    ]
+    applications = crud.build_job_applications_public(page.data)
 
-    return JobApplicationsPublic(data=applications, count=count)
+    return _job_applications_public(page, applications)
 
 
 @router.get("/applications/{application_id}", response_model=JobApplicationPublic)
@@ -306,12 +323,13 @@ def get_job_application_by_id(
 @router.get("/{job_id}/applications", response_model=JobApplicationsPublic)
 def get_job_applications_by_job_id(
     session: SessionDep, current_user: CurrentUser, job_id: uuid.UUID,
-    skip: int = 0, limit: int = 100
+    skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
 ) -> Any:
     """
     Get the applications for a specific job. (Only for clients)
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(
             status_code=403, detail="Only for clients"
@@ -326,23 +344,14 @@ def get_job_applications_by_job_id(
             status_code=403, detail="You are not authorized to view this job applications"
         )
 
-    applications, count = crud.get_job_applications_by_job_id(
-        session=session, job_id=job_id, skip=skip, limit=limit
+    page = crud.get_job_applications_by_job_id(
+        session=session, job_id=job_id, skip=skip, limit=limit, cursor=cursor,
+        count_mode=count_mode
     )
 
-    applications = [
-        JobApplicationPublic(
-            **app.dict(),
-            candidate_details=app.candidate,
-            job_details=JobPublic(
-                **app.job.dict(),
-                client_details=app.job.client,
-            )
-        )
-        for app in applications
-    ]
+    applications = crud.build_job_applications_public(page.data)
 
-    return JobApplicationsPublic(data=applications, count=count)
+    return _job_applications_public(page, applications)
 
 
 @router.get("/applications/{job_id}/status")
@@ -352,7 +361,7 @@ def get_job_application_status(
     """
     Fetch the application status of the current user for a specific job.
     """
-    candidate = crud.get_candidate_by_email(session=session, email=current_user.email)
+    candidate = as_candidate(current_user)
     if not candidate:
         raise HTTPException(
             status_code=403, detail="Only for candidates"
@@ -379,7 +388,7 @@ def update_job_application_status(
     """
     Update the status of a job application. (Only for clients)
     """
-    client = crud.get_client_by_email(session=session, email=current_user.email)
+    client = as_client(current_user)
     if not client:
         raise HTTPException(status_code=403, detail="Only for clients")
 
@@ -406,47 +415,48 @@ def update_job_application_status(
 
 
 @router.get("/skills/search", response_model=List[str])
-def search_skills(
-    session: SessionDep, current_user: CurrentUser,
-    query: str = Query(..., min_length=2, max_length=50)
+async def search_skills(
+    current_user: AsyncCurrentUser,
+    query: str = Query(..., min_length=2, max_length=50),
+    limit: int = Query(20, ge=1, le=100)
 ):
     """
     Search for skills by name.
     """
-    skills = session.exec(
-        select(Skills.name).where(Skills.name.ilike(f"%{query}%"))).all()
+    await reference_data.ensure_fresh_async()
+    skills = reference_data.search_skills(query, limit)
     if not skills:
         raise HTTPException(status_code=404, detail="No skills found")
     return skills
 
 
 @router.get("/locations/search", response_model=List[Locations])
-def search_locations(
-    session: SessionDep, current_user: CurrentUser,
-    query: str = Query(..., min_length=2, max_length=50)
+async def search_locations(
+    current_user: AsyncCurrentUser,
+    query: str = Query(..., min_length=2, max_length=50),
+    limit: int = Query(20, ge=1, le=100)
 ):
     """
     Search for locations by city name.
     """
-    locations = session.exec(
-        select(Locations).where(Locations.city.ilike(f"%{query}%"))
-    ).all()
+    await reference_data.ensure_fresh_async()
+    locations = reference_data.search_locations(query, limit)
     if not locations:
         raise HTTPException(status_code=404, detail="No locations found")
     return locations
 
 
 @router.get("/industries/search", response_model=List[Industry])
-def search_industries(
-    session: SessionDep, current_user: CurrentUser,
-    query: str = Query(..., min_length=2, max_length=255)
+async def search_industries(
+    current_user: AsyncCurrentUser,
+    query: str = Query(..., min_length=2, max_length=255),
+    limit: int = Query(20, ge=1, le=100)
 ):
     """
     Search for industries by name.
     """
-    industries = session.exec(
-        select(Industry).where(Industry.industry.ilike(f"%{query}%"))
-    ).all()
+    await reference_data.ensure_fresh_async()
+    industries = reference_data.search_industries(query, limit)
     if not industries:
         raise HTTPException(status_code=404, detail="No industries found")
     return industries
@@ -468,21 +478,51 @@ def salary_recommendation(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    I, Wi, E, We, skills_profiency, skill_weights, market_premiums, \
-    location_multiplier, trend_percentage, C, Wc, risk_percentage, \
-    benefits, transparency_score, transparency_weight, \
-    equity_score, diversity_premium, flexibility_score, \
-    flexibility_multiplier, well_being_value, functional_multiplier, \
-    market_demand_multiplier = \
-        crud.get_salary_recommendation_data(session, candidate)
-
-    # Calculate salary
-    recommended_salary = calculate_final_salary(
-        I, Wi, E, We, skills_profiency, skill_weights, market_premiums,
-        location_multiplier, trend_percentage, C, Wc, risk_percentage,
-        benefits, transparency_score, transparency_weight,
-        equity_score, diversity_premium, flexibility_score,
-        flexibility_multiplier, well_being_value, functional_multiplier,
-        market_demand_multiplier
+    context, skills = crud.get_salary_recommendation_data(session, job, candidate)
+    recommendation = recommend_salary(context, skills)
+    return round(recommendation.final_salary)
+
+
+@router.post("/{job_id}/salary-recommendations", response_model=SalaryRecommendationsResponse)
+def salary_recommendations(
+    session: SessionDep, current_user: CurrentUser,
+    job_id: uuid.UUID, body: SalaryRecommendationsRequest
+):
+    """
+    Salary Recommendations for many candidates for a specific job, with the
+    salary components of each. Candidates the recommendation can't be
+    calculated for get an error instead.
+    """
+    job = crud.get_job_by_id(session=session, job_id=job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    candidate_ids = list(dict.fromkeys(body.candidate_ids))
+    parameters, errors = crud.get_salary_recommendation_batch_data(
+        session, job, candidate_ids
     )
-    return round(recommended_salary)
+    recommendations = dict(zip(parameters, recommend_salaries(
+        [context for context, _ in parameters.values()],
+        [skills for _, skills in parameters.values()]
+    )))
+
+    data = []
+    for candidate_id in candidate_ids:
+        recommendation = recommendations.get(candidate_id)
+        if not recommendation:
+            data.append(CandidateSalaryRecommendation(
+                candidate_id=candidate_id, error=errors.get(candidate_id)
+            ))
+            continue
+
+        breakdown = {
+            **recommendation.components,
+            "subtotal": recommendation.subtotal,
+            "final_salary": recommendation.final_salary,
+        }
+        data.append(CandidateSalaryRecommendation(
+            candidate_id=candidate_id,
+            recommended_salary=round(recommendation.final_salary),
+            breakdown={name: round(value, 2) for name, value in breakdown.items()},
+        ))
+    return SalaryRecommendationsResponse(job_id=job_id, data=data)
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.storage import IMMUTABLE_CACHE_CONTROL
+
+router = APIRouter()
+
+# Keys of content addressed blobs, see `app.core.storage.content_key`, and
+# of their variants (`app.images.variant_key`)
+CONTENT_ADDRESSED_PATH = re.compile(
+    r"(?:^|/)[0-9a-f]{2}/(?P<name>[0-9a-f]{64}(?:_[a-z0-9_]+)?)\.[a-z0-9]+$"
+)
+
+# Content hashes of files uploaded before content addressing, by path,
+# modification time and size
+_legacy_etags = TTLCache(ttl=24 * 60 * 60, maxsize=10_000)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _legacy_etag(path: str, stat_result: os.stat_result) -> str:
+    key = (path, stat_result.st_mtime_ns, stat_result.st_size)
+    etag = _legacy_etags.get(key)
+    if etag is None:
+        etag = f'"{await run_in_threadpool(_file_sha256, path)}"'
+        _legacy_etags.set(key, etag)
+    return etag
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+@router.api_route(
+    "/uploads/{file_path:path}", methods=["GET", "HEAD"], include_in_schema=False
+)
+async def serve_upload(file_path: str, request: Request) -> Response:
+    """
+    Serves an uploaded file with a strong ETag from its content hash, 304s
+    for If-None-Match and byte ranges. Content addressed files never change
+    and are cached for good, others are revalidated.
+    """
+    root = os.path.realpath(settings.UPLOADS_DIR)
+    path = os.path.realpath(os.path.join(root, file_path))
+    hidden = any(part.startswith(".") for part in file_path.split("/"))
+    if hidden or not path.startswith(root + os.sep):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    match = CONTENT_ADDRESSED_PATH.search(file_path)
+    if match:
+        etag = f'"{match["name"]}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = await _legacy_etag(path, stat_result)
+        cache_control = "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    # Handles Range and If-Range, and sends the file with the server's
+    # zero copy path when it supports the pathsend extension
+    return FileResponse(path, stat_result=stat_result, headers=headers)
@@ -11,7 +11,10 @@ from app import crud
 from app.api.deps import SessionDep, get_current_active_superuser
 from app.core import security
 from app.core.config import settings
+from app.core.db import async_engine, engine, async_replica_engines
+from app.core.pool import pool_stats
 from app.core.security import get_password_hash
+from app.reference_data import reference_data
 
 from app.api.schemas.candidates import CandidatePublic
 from app.api.schemas.clients import ClientPublic
@@ -23,7 +26,6 @@ from app.utils import (
     generate_test_email,
     generate_password_reset_token,
     generate_reset_password_email,
-    send_email,
     verify_password_reset_token,
 )
 
@@ -52,14 +54,17 @@ def recover_password(email: str, session: SessionDep) -> ResetPasswordResponse:
     password_reset_token = generate_password_reset_token(email=email)
     password_reset_link = f"{settings.FRONTEND_HOST}/reset-password?email={email}&token={password_reset_token}"
 
-    # email_data = generate_reset_password_email(
-    #     email_to=user.email, email=email, token=password_reset_token
-    # )
-    # send_email(
-    #     email_to=user.email,
-    #     subject=email_data.subject,
-    #     html_content=email_data.html_content,
-    # )
+    if settings.emails_enabled:
+        # Sent in the background by the email outbox worker
+        email_data = generate_reset_password_email(
+            email_to=user.email, email=email, token=password_reset_token
+        )
+        crud.enqueue_email(
+            session=session,
+            email_to=user.email,
+            subject=email_data.subject,
+            html_content=email_data.html_content,
+        )
     return ResetPasswordResponse(link=password_reset_link)
 
 
@@ -117,12 +122,16 @@ def recover_password_html_content(email: str, session: SessionDep) -> Any:
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+def test_email(email_to: EmailStr, session: SessionDep) -> Message:
     """
-    Test emails.
+    Test emails. The email is queued, and sent in the background by the
+    email outbox worker.
     """
+    if not settings.emails_enabled:
+        raise HTTPException(status_code=400, detail="Emails aren't configured")
     email_data = generate_test_email(email_to=email_to)
-    send_email(
+    crud.enqueue_email(
+        session=session,
         email_to=email_to,
         subject=email_data.subject,
         html_content=email_data.html_content,
@@ -130,6 +139,34 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/reference-data-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def reference_data_stats() -> dict[str, Any]:
+    """
+    Hit/miss counters and sizes of the in-process reference data cache.
+    """
+    return reference_data.stats()
+
+
+@router.get(
+    "/db-pool-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def db_pool_stats() -> dict[str, Any]:
+    """
+    Checkout wait times and saturation of the database connection pools.
+    """
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine.sync_engine),
+        "replicas": [
+            pool_stats(replica.sync_engine) for replica in async_replica_engines
+        ],
+    }
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
@@ -76,6 +76,7 @@ class CandidatePrivate(SQLModel):
 
 class CandidatePublic(CandidateBase):
     id: uuid.UUID
+    avatar_variants: Optional[dict[str, str]] = None
 
 
 class CandidatesPublic(SQLModel):
@@ -57,6 +57,7 @@ class ClientPrivate(SQLModel):
 
 class ClientPublic(ClientBase):
     id: uuid.UUID
+    avatar_variants: Optional[dict[str, str]] = None
 
 
 class ClientsPublic(SQLModel):
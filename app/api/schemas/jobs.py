@@ -2,7 +2,7 @@ import uuid
 import datetime
 from pydantic import BaseModel, EmailStr, condecimal
 from sqlmodel import SQLModel, Field, Column, JSON
-from typing import Optional, List
+from typing import Dict, Optional, List
 from enum import Enum
 from app.api.schemas.candidates import CandidatePublic
 from app.api.schemas.clients import ClientPublic
@@ -43,6 +43,13 @@ class ApplicationStatusEnum(str, Enum):
     rejected = "rejected"
 
 
+class CountModeEnum(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+    cached = "cached"
+    none = "none"
+
+
 class JobBase(SQLModel):
     title: str
     description: str
@@ -71,6 +78,9 @@ class JobUpdate(JobBase):
 
 
 class JobSearch(BaseModel):
+    # Free text matched against title, location and requirements, results
+    # are ranked by relevance unless paginating with a cursor
+    query: Optional[str] = None
     title: Optional[str] = None
     location: Optional[str] = None
     salary_min: Optional[float] = None
@@ -80,6 +90,8 @@ class JobSearch(BaseModel):
     workplace_type: Optional[JobWorkplaceTypeEnum] = None
     skip: int = 0
     limit: int = 100
+    cursor: Optional[str] = None
+    count_mode: CountModeEnum = CountModeEnum.exact
 
 
 class JobPublic(JobBase):
@@ -91,7 +103,9 @@ class JobPublic(JobBase):
 
 class JobsPublic(SQLModel):
     data: List[JobPublic]
-    count: int
+    count: Optional[int]
+    count_mode: CountModeEnum = CountModeEnum.exact
+    next_cursor: Optional[str] = None
 
 
 class JobInsightsRequest(BaseModel):
@@ -121,12 +135,37 @@ class SalaryRangeDistribution(BaseModel):
     count: int
 
 
+class SalaryPercentiles(BaseModel):
+    p10: float
+    p25: float
+    median: float
+    p75: float
+    p90: float
+
+
 class MarketInsightsResponse(BaseModel):
     average_salary: Optional[float]
     total_jobs: int
     top_companies: List[TopCompany]
     job_type_distribution: List[JobTypeDistribution]
     salary_distribution: List[SalaryRangeDistribution]
+    salary_percentiles: Optional[SalaryPercentiles] = None
+
+
+class SalaryRecommendationsRequest(BaseModel):
+    candidate_ids: List[uuid.UUID] = Field(min_length=1, max_length=5000)
+
+
+class CandidateSalaryRecommendation(BaseModel):
+    candidate_id: uuid.UUID
+    recommended_salary: Optional[int] = None
+    breakdown: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+
+
+class SalaryRecommendationsResponse(BaseModel):
+    job_id: uuid.UUID
+    data: List[CandidateSalaryRecommendation]
 
 
 class JobApplicationBase(SQLModel):
@@ -158,7 +197,9 @@ class JobApplicationPublic(JobApplicationBase):
 
 class JobApplicationsPublic(SQLModel):
     data: List[JobApplicationPublic]
-    count: int
+    count: Optional[int]
+    count_mode: CountModeEnum = CountModeEnum.exact
+    next_cursor: Optional[str] = None
 
 
 class CreateSkill(SQLModel):
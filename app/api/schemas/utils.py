@@ -49,6 +49,7 @@ class SocialLoginToken(SQLModel):
 # Contents of JWT token
 class TokenPayload(SQLModel):
     sub: str | None = None
+    user_type: str | None = None
 
 
 class NewPassword(SQLModel):
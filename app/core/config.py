@@ -69,6 +69,35 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Connection pool of each engine, per worker process. Workers times
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay under Postgres'
+    # max_connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds to wait for a pooled connection before failing the request
+    DB_POOL_TIMEOUT: int = 30
+    # Seconds after which connections are replaced, -1 to keep them
+    DB_POOL_RECYCLE: int = 1800
+    # Check connections are alive before handing them out
+    DB_POOL_PRE_PING: bool = True
+    # Per statement timeout, 0 to disable
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    # Reported in pg_stat_activity
+    DB_APPLICATION_NAME: str = "salary-safe-backend"
+    # Connect through an external pooler in transaction mode (PgBouncer):
+    # no local pool, no prepared statements and the statement timeout is
+    # set per transaction since startup options aren't passed through
+    DB_EXTERNAL_POOLER: bool = False
+    # Read replicas, as comma separated database URLs, used by the read only
+    # endpoints when set
+    DATABASE_REPLICA_URIS: Annotated[
+        list[str] | str, BeforeValidator(parse_cors)
+    ] = []
+    # Replicas further behind the primary are skipped
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5
+    # How often the replication lag of each replica is measured
+    DB_REPLICA_LAG_CHECK_SECONDS: int = 10
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -92,6 +121,83 @@ class Settings(BaseSettings):
     def emails_enabled(self) -> bool:
         return bool(self.SMTP_HOST and self.EMAILS_FROM_EMAIL)
 
+    # Answer market insights from the precomputed rollup tables when the
+    # filters allow it, otherwise the job table is always scanned
+    MARKET_INSIGHTS_ROLLUPS_ENABLED: bool = True
+
+    # How long list totals requested with count_mode=cached are reused
+    COUNT_CACHE_TTL_SECONDS: int = 60
+
+    # Upper bound on how stale the in-process skills, locations and
+    # industries autocomplete indexes get when another worker changes them
+    REFERENCE_DATA_REFRESH_SECONDS: int = 300
+
+    # How long the authenticated user of a token is reused without querying
+    # the database. Changes made through this worker apply immediately,
+    # other workers see them (e.g. a deactivation) after at most this delay
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+
+    # bcrypt cost factor, hashes of another cost are upgraded on login
+    BCRYPT_ROUNDS: int = 12
+    # Threads hashing and checking passwords, and how many more requests
+    # may wait for one before being turned away with a 503
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Login attempts allowed per client IP and per email: bursts of up to
+    # *_BURST attempts, then *_PER_MINUTE attempts a minute. Behind a
+    # reverse proxy (Nginx), TRUSTED_PROXIES must list it, else every
+    # client shares the proxy's IP and its bucket.
+    LOGIN_RATE_LIMIT_IP_BURST: int = 20
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 10
+    LOGIN_RATE_LIMIT_EMAIL_BURST: int = 5
+    LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE: float = 2
+    # Addresses or networks (comma separated, e.g. 10.0.0.0/8) of the
+    # reverse proxies whose X-Forwarded-For gives the client IP
+    TRUSTED_PROXIES: Annotated[
+        list[str] | str, BeforeValidator(parse_cors)
+    ] = []
+    # Redis holding the rate limits of all workers (needs the redis
+    # package), each worker keeps its own when unset
+    RATE_LIMIT_REDIS_URL: str | None = None
+
+    # Largest accepted avatar, resume or cover letter upload
+    MAX_UPLOAD_SIZE_BYTES: int = 10 * 1024 * 1024
+    # Largest accepted request, checked on its Content-Length before the
+    # body is read. Fits the three uploads of a candidate profile update.
+    MAX_REQUEST_SIZE_BYTES: int = 32 * 1024 * 1024
+    # Where uploads are stored: "local" under UPLOADS_DIR, or "s3" in
+    # S3_BUCKET (needs boto3, credentials come from the usual AWS sources)
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    UPLOADS_DIR: str = "uploads"
+    S3_BUCKET: str | None = None
+    # Endpoint of S3 compatible services (MinIO, R2...), AWS when unset
+    S3_ENDPOINT_URL: str | None = None
+    S3_REGION: str | None = None
+    # Base URL the bucket's objects are served from (e.g. a CDN)
+    S3_PUBLIC_URL: str | None = None
+
+    # Processes generating avatar thumbnails and WebP variants
+    IMAGE_WORKERS: int = 2
+    # Processes extracting the skills of uploaded resumes
+    RESUME_WORKERS: int = 2
+
+    # Emails are queued in the email_outbox table and sent by a worker
+    # thread, in batches of up to EMAIL_OUTBOX_BATCH_SIZE over one SMTP
+    # connection. It looks for emails queued by other processes every
+    # EMAIL_OUTBOX_POLL_SECONDS
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 10
+    # Failed emails are retried after EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+    # doubling after each attempt up to EMAIL_OUTBOX_RETRY_MAX_SECONDS, and
+    # given up after EMAIL_OUTBOX_MAX_ATTEMPTS attempts
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: float = 30
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS: float = 3600
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    # How long an email being sent is hidden from the other workers, it is
+    # sent again after that when its worker died before recording the result
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 300
+
     # TODO: update type to EmailStr when sqlmodel supports it
     EMAIL_TEST_USER: str = "test@example.com"
     # TODO: update type to EmailStr when sqlmodel supports it
@@ -1,11 +1,34 @@
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.pool import configure_engine, engine_options
+from app.core.replicas import ReplicaSet
 from app.models import Client
 from app.api.schemas.clients import ClientCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), **engine_options()
+)
+configure_engine(engine)
+
+# Same database through the async psycopg driver, for async routes
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), **engine_options(is_async=True)
+)
+configure_engine(async_engine.sync_engine)
+
+async_replica_engines = [
+    create_async_engine(uri, **engine_options(is_async=True))
+    for uri in settings.DATABASE_REPLICA_URIS
+]
+for replica_engine in async_replica_engines:
+    configure_engine(replica_engine.sync_engine)
+
+async_replicas = ReplicaSet(
+    [replica_engine.sync_engine for replica_engine in async_replica_engines]
+)
 
 # Initialize the database with a superuser Client account
 def init_db(session: Session) -> None:
@@ -0,0 +1,138 @@
+"""
+Connection pool configuration of the database engines.
+
+The pools time how long requests wait to check out a connection, so pool
+exhaustion shows up in `pool_stats` before it shows up as request
+timeouts. With an external pooler in transaction mode (PgBouncer) the
+local pool is disabled, prepared statements are turned off and the
+statement timeout is set per transaction instead of at connection startup.
+"""
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.core.config import settings
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+
+class _TimedCheckoutMixin:
+    """
+    Records the time spent waiting for a connection on each checkout.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.record(time.perf_counter() - start, timed_out)
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(is_async: bool = False) -> dict[str, Any]:
+    """
+    Keyword arguments of `create_engine` / `create_async_engine` from the
+    DB_* settings.
+    """
+    connect_args: dict[str, Any] = {
+        "application_name": settings.DB_APPLICATION_NAME,
+    }
+    if settings.DB_EXTERNAL_POOLER:
+        # Prepared statements don't survive the server connection changing
+        # between transactions, and startup options are rejected
+        connect_args["prepare_threshold"] = None
+        return {"poolclass": NullPool, "connect_args": connect_args}
+
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = (
+            f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        )
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool
+        if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def configure_engine(engine: Engine) -> None:
+    """
+    Sets the statement timeout at the start of each transaction when going
+    through an external pooler. Takes the `sync_engine` of async engines.
+    """
+    if not (settings.DB_EXTERNAL_POOLER and settings.DB_STATEMENT_TIMEOUT_MS):
+        return
+
+    @event.listens_for(engine, "begin")
+    def _set_statement_timeout(connection) -> None:
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}"
+        )
+
+
+def pool_stats(engine: Engine) -> dict[str, Any]:
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None)
+    if not isinstance(pool, QueuePool) or metrics is None:
+        return {"pool": type(pool).__name__}
+
+    # A negative max_overflow means no limit
+    capacity = (
+        pool.size() + pool._max_overflow if pool._max_overflow >= 0 else 0
+    )
+    checked_out = pool.checkedout()
+    attempts = metrics.checkouts + metrics.timeouts
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 3) if capacity > 0 else None,
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_seconds_avg": round(metrics.wait_seconds_total / attempts, 6)
+        if attempts else 0.0,
+        "wait_seconds_max": round(metrics.wait_seconds_max, 6),
+    }
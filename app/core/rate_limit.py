@@ -0,0 +1,197 @@
+"""
+Token bucket rate limits.
+
+Each key gets a bucket of `burst` tokens refilled at `per_minute` tokens a
+minute, and every request takes one. Buckets live in the worker's memory,
+or in Redis when RATE_LIMIT_REDIS_URL is set so that the limits hold
+across workers; the in-memory backend stands in for Redis in tests.
+"""
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    burst: int
+    per_minute: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """
+        Takes a token from the bucket of `key`. Returns 0 when there was
+        one, else the seconds until there is one.
+        """
+
+
+class InMemoryRateLimitBackend:
+    """
+    Buckets of this worker only, at most `maxsize` of them. The least
+    recently used are dropped first, which gives them back a full bucket.
+    """
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated_at) * limit.per_second)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / limit.per_second
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Same algorithm as InMemoryRateLimitBackend, atomic on the Redis server
+# and using its clock. Buckets expire once they would be full again.
+_TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Buckets shared by all the workers, in Redis. Takes through the asyncio
+    client so the round trip doesn't block the event loop.
+    """
+
+    def __init__(self, client) -> None:
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitBackend":
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_REDIS_URL is set but the redis package isn't installed"
+            ) from exc
+        return cls(redis.Redis.from_url(url))
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        return float(
+            await self._take(keys=[key], args=[limit.burst, limit.per_second])
+        )
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, prefix: str = "rate_limit") -> None:
+        self.backend = backend
+        self.prefix = prefix
+
+    async def check(self, *buckets: tuple[str, str, RateLimit]) -> None:
+        """
+        Takes a token from each (scope, key, limit) bucket in order, raising
+        a 429 at the first empty one. Later buckets are left untouched.
+        """
+        for scope, key, limit in buckets:
+            wait = await self.backend.take(f"{self.prefix}:{scope}:{key}", limit)
+            if wait > 0:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many attempts, please try again later",
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+
+def _backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisRateLimitBackend.from_url(settings.RATE_LIMIT_REDIS_URL)
+    return InMemoryRateLimitBackend()
+
+
+rate_limiter = RateLimiter(_backend())
+
+
+def _trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        ip in ipaddress.ip_network(network, strict=False)
+        for network in settings.TRUSTED_PROXIES
+    )
+
+
+def client_ip(request: Request) -> str:
+    """
+    IP of the client that sent the request. When the request comes from one
+    of TRUSTED_PROXIES, it's the last X-Forwarded-For address not added by
+    a trusted proxy, as the ones before it can be forged by the client.
+    """
+    ip = request.client.host if request.client else "unknown"
+    if not _trusted_proxy(ip):
+        return ip
+    forwarded_for = [
+        address.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for address in header.split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded_for):
+        ip = address
+        if not _trusted_proxy(address):
+            break
+    return ip
+
+
+async def check_login_rate_limit(request: Request, email: Optional[str]) -> None:
+    """
+    Throttles login attempts per client IP and per email, before the
+    credentials are checked.
+    """
+    buckets = [(
+        "login:ip", client_ip(request),
+        RateLimit(
+            settings.LOGIN_RATE_LIMIT_IP_BURST,
+            settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE,
+        ),
+    )]
+    if email:
+        buckets.append((
+            "login:email", email.strip().lower(),
+            RateLimit(
+                settings.LOGIN_RATE_LIMIT_EMAIL_BURST,
+                settings.LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE,
+            ),
+        ))
+    await rate_limiter.check(*buckets)
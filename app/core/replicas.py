@@ -0,0 +1,134 @@
+"""
+Routing of read only sessions to the read replicas.
+
+A `RoutingSession` reads from one replica, picked when it first reads and
+kept for the rest of the session so its reads are consistent. Writes,
+flushes, `SELECT ... FOR UPDATE` and everything after them go to the
+primary so the session reads its own writes. Replicas lagging more than
+DB_REPLICA_MAX_LAG_SECONDS behind the primary, or unreachable, are skipped
+and reads fall back to the primary when none is left.
+"""
+import itertools
+import logging
+import threading
+import time
+from typing import Optional, Sequence
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.sql.dml import UpdateBase
+from sqlmodel import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds since the last transaction replayed from the primary, 0 when the
+# replica has replayed everything it received
+REPLICATION_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+    "END"
+)
+
+
+class ReplicaSet:
+    """
+    Read replicas and their last measured replication lag, checked again
+    when older than DB_REPLICA_LAG_CHECK_SECONDS.
+    """
+
+    def __init__(self, engines: Sequence[Engine] = ()) -> None:
+        self.engines = list(engines)
+        self._lags: dict[Engine, Optional[float]] = {}
+        self._checked_at: dict[Engine, float] = {}
+        self._checking: set[Engine] = set()
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Next replica in round-robin order that is within the allowed lag,
+        `None` when there is none.
+        """
+        if not self.engines:
+            return None
+
+        start = next(self._next)
+        for offset in range(len(self.engines)):
+            engine = self.engines[(start + offset) % len(self.engines)]
+            lag = self.lag(engine)
+            if lag is not None and lag <= settings.DB_REPLICA_MAX_LAG_SECONDS:
+                return engine
+        return None
+
+    def lag(self, engine: Engine) -> Optional[float]:
+        """
+        Replication lag of `engine` in seconds, `None` if it's unreachable.
+        """
+        with self._lock:
+            checked_at = self._checked_at.get(engine)
+            due = checked_at is None or (
+                time.monotonic() - checked_at > settings.DB_REPLICA_LAG_CHECK_SECONDS
+            )
+            # Other sessions keep using the last value during a check
+            if not due or engine in self._checking:
+                return self._lags.get(engine)
+            self._checking.add(engine)
+
+        try:
+            lag = self._measure_lag(engine)
+        except Exception:
+            logger.warning("Unable to check replica %s", engine.url, exc_info=True)
+            lag = None
+        with self._lock:
+            self._lags[engine] = lag
+            self._checked_at[engine] = time.monotonic()
+            self._checking.discard(engine)
+        return lag
+
+    def _measure_lag(self, engine: Engine) -> float:
+        if engine.dialect.name != "postgresql":
+            return 0.0
+        with engine.connect() as connection:
+            return float(connection.execute(REPLICATION_LAG_SQL).scalar() or 0)
+
+
+class RoutingSession(Session):
+    """
+    Session reading from `replicas` until it writes, see the module
+    docstring.
+    """
+
+    def __init__(
+        self, *args, primary: Engine, replicas: ReplicaSet, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replicas = replicas
+
+    def use_primary(self) -> None:
+        """
+        Sends all the following statements to the primary.
+        """
+        self.info["use_primary"] = True
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        if self.info.get("use_primary"):
+            return self.primary
+        if isinstance(clause, UpdateBase) or (
+            getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self.use_primary()
+            return self.primary
+
+        if "replica" not in self.info:
+            self.info["replica"] = self.replicas.choose()
+        return self.info["replica"] or self.primary
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _flush_to_primary(session, flush_context, instances) -> None:
+    session.use_primary()
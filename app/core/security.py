@@ -1,27 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable
 
 import jwt
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt takes hundreds of milliseconds per hash on purpose. It runs on
+# its own bounded pool so logins can't hold the event loop or every
+# threadpool thread, and requests beyond what the pool can queue fail fast.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password"
+)
+_password_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING
+)
 
 
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+def create_access_token(
+    subject: str | Any, expires_delta: timedelta, user_type: str | None = None
+) -> str:
+    """
+    `user_type` ("candidate" or "client") tells which table `subject` is in.
+    """
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode = {"exp": expire, "sub": str(subject)}
+    if user_type:
+        to_encode["user_type"] = user_type
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def _submit_password_work(function: Callable, *args: Any) -> Future:
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many login attempts in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+    future = _password_executor.submit(function, *args)
+    future.add_done_callback(lambda _: _password_slots.release())
+    return future
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit_password_work(
+        pwd_context.verify, plain_password, hashed_password
+    ).result()
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Whether the password matches, and its new hash when the stored one
+    doesn't use the current BCRYPT_ROUNDS.
+    """
+    return _submit_password_work(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    ).result()
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _submit_password_work(pwd_context.hash, password).result()
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return await asyncio.wrap_future(_submit_password_work(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    ))
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.wrap_future(
+        _submit_password_work(pwd_context.hash, password)
+    )
@@ -0,0 +1,146 @@
+"""
+Content addressed storage of uploaded files.
+
+Blobs are named after the SHA-256 of their content, so an upload already
+stored under its key isn't written again, and a key's content never
+changes. Uploads are stored on the local disk under UPLOADS_DIR, or in an
+S3 compatible bucket shared by all the API nodes (needs boto3).
+"""
+import mimetypes
+import os
+import tempfile
+import uuid
+from typing import Optional, Protocol
+
+from app.core.config import settings
+
+# Content addressed keys never change content, clients can keep them
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def content_key(folder: str, sha256: str, extension: str) -> str:
+    return f"{folder}/{sha256[:2]}/{sha256}.{extension}"
+
+
+class Storage(Protocol):
+    def staging_path(self) -> str:
+        """
+        Path to write an upload to before it is `put`.
+        """
+
+    def exists(self, key: str) -> bool:
+        ...
+
+    def read(self, key: str) -> bytes:
+        ...
+
+    def put(self, key: str, path: str) -> bool:
+        """
+        Stores the file at `path` under `key`, unless there's already a
+        blob under `key`. Returns whether it was stored. The file at
+        `path` may be moved.
+        """
+
+    def url(self, key: str) -> str:
+        """
+        Reference to the blob stored in the database and returned to
+        clients.
+        """
+
+
+class LocalStorage:
+    """
+    Blobs under `root`, served by the API under /`url_prefix`.
+    """
+
+    def __init__(self, root: str, url_prefix: str = "uploads") -> None:
+        self.root = root
+        self.url_prefix = url_prefix
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def staging_path(self) -> str:
+        # Same filesystem as the blobs so that `put` is an atomic rename
+        staging = os.path.join(self.root, ".staging")
+        os.makedirs(staging, exist_ok=True)
+        return os.path.join(staging, uuid.uuid4().hex)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def put(self, key: str, path: str) -> bool:
+        if self.exists(key):
+            return False
+        destination = self.path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(path, destination)
+        return True
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+
+class S3Storage:
+    def __init__(self, client, bucket: str, public_url: Optional[str] = None) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.public_url = (
+            public_url or f"https://{bucket}.s3.amazonaws.com"
+        ).rstrip("/")
+
+    @classmethod
+    def from_settings(cls) -> "S3Storage":
+        try:
+            import boto3
+        except ImportError as exc:
+            raise RuntimeError(
+                "STORAGE_BACKEND is s3 but the boto3 package isn't installed"
+            ) from exc
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+        )
+        return cls(client, settings.S3_BUCKET, settings.S3_PUBLIC_URL)
+
+    def staging_path(self) -> str:
+        return os.path.join(tempfile.gettempdir(), f"upload-{uuid.uuid4().hex}")
+
+    def exists(self, key: str) -> bool:
+        response = self.client.list_objects_v2(
+            Bucket=self.bucket, Prefix=key, MaxKeys=1
+        )
+        return any(item["Key"] == key for item in response.get("Contents", ()))
+
+    def read(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def put(self, key: str, path: str) -> bool:
+        if self.exists(key):
+            return False
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self.client.upload_file(
+            path, self.bucket, key,
+            ExtraArgs={
+                "ContentType": content_type,
+                "CacheControl": IMMUTABLE_CACHE_CONTROL,
+            },
+        )
+        return True
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+
+def _storage_from_settings() -> Storage:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage.from_settings()
+    return LocalStorage(settings.UPLOADS_DIR)
+
+
+storage = _storage_from_settings()
@@ -0,0 +1,121 @@
+import math
+from typing import Any, Iterable, Optional
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest). Keeps about `compression`
+    centroids however many values are added, most precise at the tails,
+    and serializes to a JSON compatible dict so it can be stored per
+    segment and merged with other segments' digests at query time.
+
+    Quantiles interpolate between centroid centers like Postgres'
+    percentile_cont, so they are exact while no values have been merged.
+    """
+
+    def __init__(self, compression: int = 100) -> None:
+        self.compression = compression
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._centroids: list[list[float]] = []
+        self._buffer: list[list[float]] = []
+
+    @property
+    def count(self) -> float:
+        return sum(weight for _, weight in self._centroids + self._buffer)
+
+    def add(self, value: float, weight: float = 1) -> None:
+        value = float(value)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._buffer.append([value, weight])
+        if len(self._buffer) > 5 * self.compression:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest") -> None:
+        if other.min is None:
+            return
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._buffer.extend(
+            [mean, weight] for mean, weight in other._centroids + other._buffer
+        )
+        if len(self._buffer) > 5 * self.compression:
+            self._compress()
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        self._compress()
+        if not self._centroids:
+            return None
+
+        # Centroids are spread evenly over the ranks they cover, a centroid
+        # of weight w starting at rank r has its center at r + (w - 1) / 2
+        target = fraction * (self.count - 1)
+        previous_center, previous_mean = 0.0, self.min
+        rank = 0.0
+        for mean, weight in self._centroids:
+            center = rank + (weight - 1) / 2
+            if target <= center:
+                if center == previous_center:
+                    return mean
+                return previous_mean + (mean - previous_mean) * (
+                    (target - previous_center) / (center - previous_center)
+                )
+            previous_center, previous_mean = center, mean
+            rank += weight
+
+        last_rank = self.count - 1
+        if last_rank == previous_center:
+            return self.max
+        return previous_mean + (self.max - previous_mean) * (
+            (target - previous_center) / (last_rank - previous_center)
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "min": self.min,
+            "max": self.max,
+            "centroids": self._centroids,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict[str, Any]]) -> "TDigest":
+        digest = cls()
+        if data:
+            digest.compression = data["compression"]
+            digest.min = data["min"]
+            digest.max = data["max"]
+            digest._centroids = [list(centroid) for centroid in data["centroids"]]
+        return digest
+
+    def _scale(self, fraction: float) -> float:
+        fraction = min(max(fraction, 0.0), 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * fraction - 1)
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+
+        points = sorted(self._centroids + self._buffer)
+        total = sum(weight for _, weight in points)
+        merged = [list(points[0])]
+        merged_weight = 0.0
+        for mean, weight in points[1:]:
+            current = merged[-1]
+            lower = self._scale(merged_weight / total)
+            upper = self._scale((merged_weight + current[1] + weight) / total)
+            if upper - lower <= 1:
+                current[1] += weight
+                current[0] += (mean - current[0]) * weight / current[1]
+            else:
+                merged_weight += current[1]
+                merged.append([mean, weight])
+
+        self._centroids = merged
+        self._buffer = []
@@ -1,14 +1,36 @@
 import uuid
-from typing import Any, Optional
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Literal, Optional
 from decimal import Decimal
 
+from sqlalchemy import (
+    Float, Text, and_, case, cast, delete, exists, literal_column, or_,
+    tuple_, type_coerce, update
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from fastapi import HTTPException
 from sqlmodel import Session, select, func
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.tdigest import TDigest
+from app.core.security import get_password_hash, verify_and_update_password
+from app.reference_data import reference_data
+from app.salary_recommendation import MarketContext, SkillInput
+from app.search import text_search
+from app.utils import decode_cursor, encode_cursor
 from app.models import *
 from app.api.schemas.utils import RequestDemoBase, SocialLoginBase
-from app.api.schemas.candidates import CandidateBase, CandidateCreate, CandidateUpdate
-from app.api.schemas.clients import ClientBase, ClientCreate, ClientUpdate
+from app.api.schemas.candidates import (
+    CandidateBase, CandidateCreate, CandidatePublic, CandidateUpdate
+)
+from app.api.schemas.clients import (
+    ClientBase, ClientCreate, ClientPublic, ClientUpdate
+)
 from app.api.schemas.jobs import *
 
 
@@ -105,12 +127,29 @@ def create_or_update_candidate(
     return user, is_new_user
 
 
+def _check_password(
+    session: Session, user: Candidate | Client, password: str
+) -> bool:
+    """
+    Checks the user's password, upgrading its hash when BCRYPT_ROUNDS
+    changed since it was set.
+    """
+    if not user.hashed_password:
+        return False
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if verified and new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        session.commit()
+    return verified
+
+
 def authenticate_candidate(
     *, session: Session,email: str, password: str
 ) -> Candidate | None:
     candidate = session.query(
         Candidate).filter(Candidate.email == email).first()
-    if candidate and verify_password(password, candidate.hashed_password):
+    if candidate and _check_password(session, candidate, password):
         return candidate
 
     return None
@@ -150,6 +189,40 @@ def get_candidate_by_phone_number(
     return session_user
 
 
+def replace_candidate_resume_skills(
+    *, session: Session, candidate_id: uuid.UUID, skills: dict[str, int]
+) -> None:
+    session.exec(
+        delete(CandidateResumeSkill)
+        .where(CandidateResumeSkill.candidate_id == candidate_id)
+    )
+    session.add_all(
+        CandidateResumeSkill(
+            candidate_id=candidate_id, skill=skill, occurrences=occurrences
+        )
+        for skill, occurrences in skills.items()
+    )
+    session.commit()
+
+
+def get_candidate_resume_skills(
+    *, session: Session, candidate_ids: list[uuid.UUID]
+) -> dict[uuid.UUID, list[str]]:
+    """
+    Names of the skills found in the resumes of the candidates, most
+    mentioned first.
+    """
+    rows = session.exec(
+        select(CandidateResumeSkill)
+        .where(CandidateResumeSkill.candidate_id.in_(candidate_ids))
+        .order_by(CandidateResumeSkill.occurrences.desc())
+    ).all()
+    skills = defaultdict(list)
+    for row in rows:
+        skills[row.candidate_id].append(row.skill)
+    return skills
+
+
 ##################################################
 #                                                #
 #                    Client                      # 
@@ -174,7 +247,7 @@ def authenticate_client(
     *, session: Session, email: str, password: str
 ) -> Client | None:
     client = session.query(Client).filter(Client.email == email).first()
-    if client and verify_password(password, client.hashed_password):
+    if client and _check_password(session, client, password):
         return client
 
     return None
@@ -216,9 +289,110 @@ def get_client_by_phone_number(
 ##################################################
 
 
+@dataclass
+class Page:
+    """
+    One page of a list query. `count` is the total number of matching rows
+    as computed by `count_mode`, None when counting was skipped.
+    """
+    data: list
+    count: Optional[int]
+    count_mode: CountModeEnum
+    next_cursor: Optional[str] = None
+
+
+def _paginate(
+    session: Session, statement, model, skip: int, limit: int,
+    cursor: Optional[str] = None, rank=None
+) -> tuple[list, Optional[str]]:
+    """
+    Fetch one page of `statement` ordered by (created_at, id).
+
+    With a cursor the page starts right after the row it points at, which
+    costs the same at any depth, otherwise `skip` rows are skipped. Returns
+    the rows and the cursor of the next page, None on the last page.
+
+    Without a cursor, rows can be ordered by a `rank` expression first, such
+    pages only support offset pagination and never return a cursor.
+    """
+    order = (model.created_at, model.id)
+    if cursor:
+        rank = None
+        statement = statement.where(tuple_(*order) > tuple_(*decode_cursor(cursor)))
+    else:
+        statement = statement.offset(skip)
+
+    if rank is not None:
+        statement = statement.order_by(rank.desc(), *order)
+    else:
+        statement = statement.order_by(*order)
+
+    rows = session.exec(statement.limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    if rank is not None:
+        return rows[:limit], None
+
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement) -> None:
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+_count_cache = TTLCache(ttl=settings.COUNT_CACHE_TTL_SECONDS)
+
+
+def _count(
+    session: Session, statement, count_mode: CountModeEnum
+) -> tuple[Optional[int], CountModeEnum]:
+    """
+    Total number of rows matched by `statement`.
+
+    exact runs a count(*) over it, estimated reads the planner's row
+    estimate from EXPLAIN (Postgres only, exact elsewhere), cached reuses
+    an exact count of the same query for COUNT_CACHE_TTL_SECONDS and none
+    skips counting. Returns the count and the mode actually used.
+    """
+    if count_mode == CountModeEnum.none:
+        return None, count_mode
+
+    dialect = session.get_bind().dialect
+    if count_mode == CountModeEnum.estimated:
+        if dialect.name == "postgresql":
+            plan = session.execute(_Explain(statement)).scalar_one()
+            return int(plan[0]["Plan"]["Plan Rows"]), count_mode
+        count_mode = CountModeEnum.exact
+
+    count_statement = select(func.count()).select_from(statement.subquery())
+    if count_mode == CountModeEnum.exact:
+        return session.exec(count_statement).one(), count_mode
+
+    compiled = count_statement.compile(dialect=dialect)
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    count = _count_cache.get(key)
+    if count is None:
+        count = session.exec(count_statement).one()
+        _count_cache.set(key, count)
+
+    return count, count_mode
+
+
 def create_job(*, session: Session, job_in: JobCreate) -> Job:
     db_job = Job.model_validate(job_in)
     session.add(db_job)
+    session.flush()
+    apply_job_to_market_rollups(session=session, job=db_job, sign=1)
+    refresh_salary_statistics(session=session, segments={_salary_segment(db_job)})
     session.commit()
     session.refresh(db_job)
 
@@ -226,24 +400,20 @@ def create_job(*, session: Session, job_in: JobCreate) -> Job:
 
 
 def get_jobs(
-    session: Session, skip: int = 0, limit: int = 100
-) -> tuple[List[Job], int]:
+    session: Session, skip: int = 0, limit: int = 100,
+    cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
+) -> Page:
 
-    statement = (
-        select(Job, Client.company_name)
-        .join(Client, Job.client_id == Client.id, isouter=True)
-        .offset(skip)
-        .limit(limit)
+    statement = select(Job)
+    jobs, next_cursor = _paginate(
+        session, statement.options(selectinload(Job.client)), Job,
+        skip, limit, cursor
     )
-    jobs = session.exec(statement).all()
-    jobs = [
-        JobPublic(**job.dict(), company_name=company_name)
-        for job, company_name in jobs
-    ]
 
-    count = session.exec(select(func.count()).select_from(Job)).one()
+    count, count_mode = _count(session, statement, count_mode)
 
-    return jobs, count
+    return Page(jobs, count, count_mode, next_cursor)
 
 
 def get_job_by_id(session: Session, job_id=uuid.UUID):
@@ -252,33 +422,66 @@ def get_job_by_id(session: Session, job_id=uuid.UUID):
 
 
 def get_jobs_by_client(
-    *, session: Session, client_id: uuid.UUID, skip: int, limit: int
-) -> tuple[list[Job], int]:
+    *, session: Session, client_id: uuid.UUID, skip: int, limit: int,
+    cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
+) -> Page:
 
     statement = select(Job).where(Job.client_id == client_id)
-    jobs = session.exec(statement.offset(skip).limit(limit)).all()
+    jobs, next_cursor = _paginate(
+        session, statement.options(selectinload(Job.client)), Job,
+        skip, limit, cursor
+    )
 
-    total_count = session.exec(
-        select(func.count()).select_from(statement.subquery())).one()
+    total_count, count_mode = _count(session, statement, count_mode)
 
-    return jobs, total_count
+    return Page(jobs, total_count, count_mode, next_cursor)
 
 
 def update_job(*, session: Session, db_client: Job, job_in: JobUpdate) -> Job:
     job_data = job_in.model_dump(exclude_unset=True)
+    apply_job_to_market_rollups(session=session, job=db_client, sign=-1)
+    rollup_segment = _market_rollup_segment(db_client)
+    segments = {_salary_segment(db_client)}
     db_client.sqlmodel_update(job_data)
     session.add(db_client)
+    session.flush()
+    apply_job_to_market_rollups(session=session, job=db_client, sign=1)
+    rebuild_market_rollup_digests(session=session, segments={rollup_segment})
+    segments.add(_salary_segment(db_client))
+    refresh_salary_statistics(session=session, segments=segments)
     session.commit()
     session.refresh(db_client)
 
     return db_client
 
 
+def delete_job(*, session: Session, db_job: Job) -> None:
+    apply_job_to_market_rollups(session=session, job=db_job, sign=-1)
+    rollup_segment = _market_rollup_segment(db_job)
+    segment = _salary_segment(db_job)
+    session.delete(db_job)
+    session.flush()
+    rebuild_market_rollup_digests(session=session, segments={rollup_segment})
+    refresh_salary_statistics(session=session, segments={segment})
+    session.commit()
+
+
 def search_jobs(
     *, session: Session, filters: JobSearch
-) -> tuple[list[Job], int]:
+) -> Page:
     statement = select(Job)
 
+    rank = None
+    if filters.query:
+        condition, rank = text_search(
+            session.get_bind().dialect.name,
+            [getattr(Job, column) for column in JOB_SEARCH_COLUMNS],
+            filters.query,
+            weights=JOB_SEARCH_WEIGHTS,
+        )
+        if condition is not None:
+            statement = statement.where(condition)
     if filters.title:
         statement = statement.where(Job.title.ilike(f"%{filters.title}%"))
     if filters.location:
@@ -294,24 +497,52 @@ def search_jobs(
     if filters.workplace_type:
         statement = statement.where(Job.workplace_type == filters.workplace_type)
 
-    total_count = session.exec(
-        select(func.count()).select_from(statement.subquery())
-    ).one()
+    total_count, count_mode = _count(session, statement, filters.count_mode)
 
-    jobs = session.exec(statement.offset(filters.skip).limit(filters.limit)).all()
+    jobs, next_cursor = _paginate(
+        session, statement.options(selectinload(Job.client)), Job,
+        filters.skip, filters.limit, filters.cursor, rank=rank
+    )
 
-    return jobs, total_count
+    return Page(jobs, total_count, count_mode, next_cursor)
 
 
-def get_matching_jobs_for_candidate(
-    *, session: Session, candidate: Candidate,
-    skip: int, limit: int
+def _requires_any_skill(dialect_name: str, skills: list[str]):
+    """
+    Condition on jobs whose required skills include any of `skills`,
+    ignoring case: clients and resumes don't agree on "PostgreSQL" and
+    "postgresql".
+    """
+    skills = sorted({skill.lower() for skill in skills})
+    if dialect_name == "postgresql":
+        # Lowering the array's JSON text lowers each of its strings
+        required_skills = cast(
+            func.lower(cast(Job.required_skills, Text)), postgresql.JSONB
+        )
+        return required_skills.op("?|")(postgresql.array(skills))
+    required_skills = func.json_each(Job.required_skills).table_valued("value")
+    return exists(
+        select(1).select_from(required_skills)
+        .where(func.lower(required_skills.c.value).in_(skills))
+    )
+
+
+def _matching_jobs_statement(
+    candidate: Candidate, skills: list[str] = (), dialect_name: str = ""
 ):
+    """
+    Active jobs matching the candidate's preferences. Jobs requiring one of
+    the candidate's `skills` match whatever their title.
+    """
     statement = select(Job).where(Job.status == "active")
 
     if candidate.job_titles_of_interest:
+        title_matches = Job.title.ilike(
+            f"%{candidate.job_titles_of_interest.strip().lower()}%"
+        )
         statement = statement.where(
-            Job.title.ilike(f"%{candidate.job_titles_of_interest.strip().lower()}%")
+            or_(title_matches, _requires_any_skill(dialect_name, list(skills)))
+            if skills else title_matches
         )
 
     if candidate.location:
@@ -333,36 +564,107 @@ def get_matching_jobs_for_candidate(
         statement = statement.where(
             Job.salary_max <= Decimal(candidate.general_salary_range)
         )
-    jobs = session.exec(statement.offset(skip).limit(limit)).all()
+    return statement
 
-    total_count = session.exec(
-        select(func.count()).select_from(statement.subquery())).one()
 
-    return jobs, total_count
+def get_matching_jobs_for_candidate(
+    *, session: Session, candidate: Candidate,
+    skip: int, limit: int, cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
+) -> Page:
+    # Skills listed in the profile or found in the resume
+    skills = [skill["name"] for skill in candidate.key_skills or []]
+    skills += get_candidate_resume_skills(
+        session=session, candidate_ids=[candidate.id]
+    ).get(candidate.id, [])
+    statement = _matching_jobs_statement(
+        candidate, skills, session.get_bind().dialect.name
+    )
+    jobs, next_cursor = _paginate(
+        session, statement.options(selectinload(Job.client)), Job,
+        skip, limit, cursor
+    )
+
+    total_count, count_mode = _count(session, statement, count_mode)
+
+    return Page(jobs, total_count, count_mode, next_cursor)
 
 
-def get_market_insights(session: Session, filters: JobInsightsRequest):
-    query = select(Job)
+# Salary ranges (min, max) used for the market insights salary distribution,
+# a max of None means the range is open ended.
+MARKET_SALARY_RANGES = [
+    (0, 25000), (25000, 50000), (50000, 75000),
+    (75000, 100000), (100000, None)
+]
+
+
+def _market_insights_conditions(filters: JobInsightsRequest) -> list:
+    conditions = []
 
     if filters.title:
-        query = query.where(Job.title.ilike(f"%{filters.title}%"))
+        conditions.append(Job.title.ilike(f"%{filters.title}%"))
     if filters.location:
-        query = query.where(Job.location.ilike(f"%{filters.location}%"))
+        conditions.append(Job.location.ilike(f"%{filters.location}%"))
     if filters.requirements:
-        query = query.where(Job.requirements.ilike(f"%{filters.requirements}%"))
+        conditions.append(Job.requirements.ilike(f"%{filters.requirements}%"))
     if filters.min_salary is not None:
-        query = query.where(Job.salary_min >= filters.min_salary)
+        conditions.append(Job.salary_min >= filters.min_salary)
     if filters.max_salary is not None:
-        query = query.where(Job.salary_max <= filters.max_salary)
+        conditions.append(Job.salary_max <= filters.max_salary)
     if filters.status:
-        query = query.where(Job.status == filters.status)
+        conditions.append(Job.status == filters.status)
     if filters.job_type:
-        query = query.where(Job.job_type == filters.job_type)
+        conditions.append(Job.job_type == filters.job_type)
     if filters.workplace_type:
-        query = query.where(Job.workplace_type == filters.workplace_type)
+        conditions.append(Job.workplace_type == filters.workplace_type)
+
+    return conditions
+
 
-    jobs = session.exec(query).all()
-    if not jobs:
+def _salary_range_label(min_sal, max_sal) -> str:
+    return f"{min_sal} - {max_sal if max_sal else 'Above'}"
+
+
+def _salary_bucket_expression(salary_ranges):
+    """
+    SQL expression giving the index of the first salary range a job falls
+    in, or -1 when it doesn't fall in any of them.
+    """
+    whens = []
+    for index, (min_sal, max_sal) in enumerate(salary_ranges):
+        condition = Job.salary_min >= min_sal
+        if max_sal:
+            condition = and_(condition, Job.salary_max <= max_sal)
+        whens.append((condition, index))
+
+    return case(*whens, else_=-1)
+
+
+def _build_market_insights(
+    rows, salary_ranges, salary_percentiles=None
+) -> MarketInsightsResponse:
+    """
+    Reduce (company_name, job_type, salary_bucket, job_count, salary_sum,
+    salary_count) groups into the market insights response.
+    """
+    total_jobs = 0
+    salary_sum = 0
+    salary_count = 0
+    company_counts = defaultdict(int)
+    job_type_counts = defaultdict(int)
+    bucket_counts = defaultdict(int)
+
+    for company_name, job_type, bucket, group_jobs, group_sum, group_count in rows:
+        total_jobs += group_jobs
+        if group_count:
+            salary_sum += group_sum
+            salary_count += group_count
+        if company_name is not None:
+            company_counts[company_name] += group_jobs
+        job_type_counts[job_type] += group_jobs
+        bucket_counts[bucket] += group_jobs
+
+    if not total_jobs:
         return MarketInsightsResponse(
             average_salary=None,
             total_jobs=0,
@@ -371,69 +673,546 @@ def get_market_insights(session: Session, filters: JobInsightsRequest):
             salary_distribution=[],
         )
 
-    # Total job postings
-    total_jobs = len(jobs)
-
-    # Average salary calculation
-    avg_salary = session.exec(
-        select(func.avg((Job.salary_min + Job.salary_max) / 2))
-        .select_from(Job)
-        .where(Job.id.in_([job.id for job in jobs]))
-    ).one_or_none()
-
-    # Top companies hiring
-    company_counts = (
-        session.exec(
-            select(Client.company_name, func.count(Job.id))
-            .join(Client, Client.id == Job.client_id)
-            .where(Job.id.in_([job.id for job in jobs]))
-            .group_by(Client.company_name)
-            .order_by(func.count(Job.id).desc())
-        ).all()
-    )
     top_companies = [
-        {"company_name": name, "job_count": count} for name, count in company_counts
+        {"company_name": name, "job_count": count}
+        for name, count in sorted(
+            company_counts.items(), key=lambda item: (-item[1], item[0])
+        )
     ]
-
-    # Job type distribution
-    job_type_counts = (
-        session.exec(
-            select(Job.job_type, func.count(Job.id))
-            .where(Job.id.in_([job.id for job in jobs]))
-            .group_by(Job.job_type)
-        ).all()
-    )
     job_type_distribution = [
-        {"job_type": jt, "count": count} for jt, count in job_type_counts
+        {"job_type": job_type, "count": count}
+        for job_type, count in job_type_counts.items()
     ]
-
-    # Salary range distribution
-    salary_ranges = [
-        (0, 25000), (25000, 50000), (50000, 75000),
-        (75000, 100000), (100000, None)
+    salary_distribution = [
+        {
+            "range": _salary_range_label(min_sal, max_sal),
+            "count": bucket_counts.get(index, 0)
+        }
+        for index, (min_sal, max_sal) in enumerate(salary_ranges)
     ]
-    salary_distribution = []
-    for min_sal, max_sal in salary_ranges:
-        range_label = f"{min_sal} - {max_sal if max_sal else 'Above'}"
-        count = session.exec(
-            select(func.count(Job.id))
-            .where(
-                Job.salary_min >= min_sal,
-                (Job.salary_max <= max_sal) if max_sal else True,
-                Job.id.in_([job.id for job in jobs])
-            )
-        ).one_or_none()
-        salary_distribution.append({"range": range_label, "count": count})
 
     return MarketInsightsResponse(
-        average_salary=avg_salary,
+        average_salary=salary_sum / salary_count if salary_count else None,
         total_jobs=total_jobs,
         top_companies=top_companies,
         job_type_distribution=job_type_distribution,
         salary_distribution=salary_distribution,
+        salary_percentiles=salary_percentiles,
+    )
+
+
+def _salary_bucket(salary_min, salary_max, salary_ranges=None) -> int:
+    """
+    Python counterpart of `_salary_bucket_expression` for a single job.
+    """
+    if salary_ranges is None:
+        salary_ranges = MARKET_SALARY_RANGES
+    if salary_min is None:
+        return -1
+    for index, (min_sal, max_sal) in enumerate(salary_ranges):
+        if salary_min < min_sal:
+            continue
+        if not max_sal or (salary_max is not None and salary_max <= max_sal):
+            return index
+
+    return -1
+
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+
+def _dialect_insert(session: Session):
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+
+_MARKET_ROLLUP_SEGMENT = (
+    "location", "job_type", "workplace_type", "status",
+    "salary_bucket", "client_id"
+)
+
+
+def _market_rollup_segment(job: Job) -> tuple:
+    """
+    Values of the `_MARKET_ROLLUP_SEGMENT` columns for a job
+    """
+    return (
+        job.location or "",
+        _enum_value(job.job_type),
+        _enum_value(job.workplace_type),
+        _enum_value(job.status),
+        _salary_bucket(job.salary_min, job.salary_max),
+        job.client_id,
+    )
+
+
+def _market_rollup_conditions(segment: tuple) -> list:
+    rollup = MarketInsightsRollup.__table__.c
+    return [
+        rollup[column] == value
+        for column, value in zip(_MARKET_ROLLUP_SEGMENT, segment)
+    ]
+
+
+def apply_job_to_market_rollups(*, session: Session, job: Job, sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) a job from its market insights rollup
+    segment. Runs inside the caller's transaction.
+
+    Salaries can't be removed from a digest, after removing jobs the caller
+    rebuilds the digests of their segments with
+    `rebuild_market_rollup_digests` once the change is flushed.
+    """
+    has_salary = job.salary_min is not None and job.salary_max is not None
+    salary_mid = (job.salary_min + job.salary_max) / 2 if has_salary else 0
+    segment = _market_rollup_segment(job)
+
+    insert = _dialect_insert(session)(MarketInsightsRollup).values(
+        id=uuid.uuid4(),
+        **dict(zip(_MARKET_ROLLUP_SEGMENT, segment)),
+        job_count=sign,
+        salary_sum=salary_mid * sign,
+        salary_count=sign if has_salary else 0,
+    )
+    rollup = MarketInsightsRollup.__table__.c
+    statement = insert.on_conflict_do_update(
+        index_elements=list(_MARKET_ROLLUP_SEGMENT),
+        set_={
+            "job_count": rollup.job_count + insert.excluded.job_count,
+            "salary_sum": rollup.salary_sum + insert.excluded.salary_sum,
+            "salary_count": rollup.salary_count + insert.excluded.salary_count,
+        },
+    )
+    session.execute(statement)
+
+    if sign > 0 and has_salary:
+        # The upsert holds the row lock until the end of the transaction,
+        # so concurrent jobs of the segment can't lose each other's update
+        conditions = _market_rollup_conditions(segment)
+        digest = TDigest.from_dict(session.exec(
+            select(MarketInsightsRollup.salary_digest).where(*conditions)
+        ).one())
+        digest.add(salary_mid)
+        session.execute(
+            update(MarketInsightsRollup).where(*conditions)
+            .values(salary_digest=digest.to_dict())
+        )
+
+
+def rebuild_market_rollup_digests(*, session: Session, segments: set[tuple]) -> None:
+    """
+    Rebuild the salary digests of rollup `segments` from the job table.
+    Runs inside the caller's transaction, reading only the segment's jobs
+    through the ix_job_market_rollup_segment index.
+    """
+    salary_mid = (Job.salary_min + Job.salary_max) / 2
+    salary_bucket = _salary_bucket_expression(MARKET_SALARY_RANGES)
+    # The empty string is inlined for Postgres to match the indexed expression
+    columns = (
+        func.coalesce(Job.location, literal_column("''")), Job.job_type,
+        Job.workplace_type, Job.status, salary_bucket, Job.client_id
+    )
+
+    for segment in segments:
+        digest = TDigest()
+        digest.update(session.exec(
+            select(salary_mid).where(
+                *(column == value for column, value in zip(columns, segment)),
+                salary_mid.is_not(None),
+            )
+        ))
+        session.execute(
+            update(MarketInsightsRollup)
+            .where(*_market_rollup_conditions(segment))
+            .values(salary_digest=digest.to_dict() if digest.min is not None else None)
+        )
+
+
+def refresh_market_rollups(session: Session) -> int:
+    """
+    Rebuild every market insights rollup segment from the job table.
+    Returns the number of segments.
+    """
+    salary_mid = (Job.salary_min + Job.salary_max) / 2
+    salary_bucket = _salary_bucket_expression(MARKET_SALARY_RANGES)
+    location = func.coalesce(Job.location, "")
+
+    rows = session.exec(
+        select(
+            location,
+            Job.job_type,
+            Job.workplace_type,
+            Job.status,
+            salary_bucket,
+            Job.client_id,
+            func.count(Job.id),
+            func.coalesce(func.sum(salary_mid), 0),
+            func.count(salary_mid),
+        ).group_by(
+            location, Job.job_type, Job.workplace_type, Job.status,
+            salary_bucket, Job.client_id
+        )
+    ).all()
+
+    digests = defaultdict(TDigest)
+    salaries = session.exec(
+        select(
+            location, Job.job_type, Job.workplace_type, Job.status,
+            salary_bucket, Job.client_id, salary_mid,
+        ).where(salary_mid.is_not(None))
+    )
+    for *segment, salary in salaries:
+        digests[tuple(_enum_value(value) for value in segment)].add(salary)
+
+    session.execute(delete(MarketInsightsRollup))
+    for row in rows:
+        segment = tuple(_enum_value(value) for value in row[:6])
+        digest = digests.get(segment)
+        session.add(MarketInsightsRollup(
+            **dict(zip(_MARKET_ROLLUP_SEGMENT, segment)),
+            job_count=row[6],
+            salary_sum=row[7],
+            salary_count=row[8],
+            salary_digest=digest.to_dict() if digest else None,
+        ))
+    session.commit()
+
+    return len(rows)
+
+
+def _market_rollups_can_answer(filters: JobInsightsRequest, salary_ranges) -> bool:
+    """
+    Rollups only keep exact segment values, so substring filters on title
+    and requirements and arbitrary salary bounds need the job table.
+    """
+    return (
+        settings.MARKET_INSIGHTS_ROLLUPS_ENABLED
+        and salary_ranges == MARKET_SALARY_RANGES
+        and not filters.title
+        and not filters.requirements
+        and filters.min_salary is None
+        and filters.max_salary is None
+    )
+
+
+def _get_market_insights_from_rollups(
+    session: Session, filters: JobInsightsRequest
+) -> MarketInsightsResponse:
+    conditions = []
+    if filters.location:
+        conditions.append(
+            MarketInsightsRollup.location.ilike(f"%{filters.location}%")
+        )
+    if filters.status:
+        conditions.append(
+            MarketInsightsRollup.status == _enum_value(filters.status)
+        )
+    if filters.job_type:
+        conditions.append(
+            MarketInsightsRollup.job_type == _enum_value(filters.job_type)
+        )
+    if filters.workplace_type:
+        conditions.append(
+            MarketInsightsRollup.workplace_type == _enum_value(filters.workplace_type)
+        )
+
+    statement = (
+        select(
+            Client.company_name,
+            MarketInsightsRollup.job_type,
+            MarketInsightsRollup.salary_bucket,
+            func.sum(MarketInsightsRollup.job_count),
+            func.sum(MarketInsightsRollup.salary_sum),
+            func.sum(MarketInsightsRollup.salary_count),
+        )
+        .join(Client, Client.id == MarketInsightsRollup.client_id)
+        .where(*conditions)
+        .group_by(
+            Client.company_name,
+            MarketInsightsRollup.job_type,
+            MarketInsightsRollup.salary_bucket,
+        )
+        .having(func.sum(MarketInsightsRollup.job_count) > 0)
+    )
+    rows = session.exec(statement).all()
+
+    # Percentiles merge the digests of the matching segments, whatever the
+    # number of jobs in them
+    digest = TDigest()
+    for segment_digest in session.exec(
+        select(MarketInsightsRollup.salary_digest).where(
+            *conditions, MarketInsightsRollup.salary_digest.is_not(None)
+        )
+    ):
+        digest.merge(TDigest.from_dict(segment_digest))
+
+    return _build_market_insights(
+        rows, MARKET_SALARY_RANGES, _digest_percentiles(digest)
+    )
+
+
+def _digest_percentiles(digest: TDigest) -> Optional[dict[str, float]]:
+    if digest.min is None:
+        return None
+    return {
+        name: digest.quantile(fraction)
+        for name, fraction in SALARY_PERCENTILES.items()
+    }
+
+
+def _salary_percentiles_sql(
+    session: Session, conditions: list
+) -> Optional[dict[str, float]]:
+    """
+    Salary percentiles of the jobs matching `conditions`, computed by the
+    database with percentile_cont so only the percentiles are read back.
+    Postgres only, `None` on the other databases.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+    salary_mid = cast((Job.salary_min + Job.salary_max) / 2, Float)
+    values = session.exec(
+        select(type_coerce(
+            func.percentile_cont(
+                cast(
+                    postgresql.array(list(SALARY_PERCENTILES.values())),
+                    postgresql.ARRAY(Float),
+                )
+            ).within_group(salary_mid),
+            postgresql.ARRAY(Float),
+        ))
+        .join(Client, Client.id == Job.client_id)
+        .where(*conditions, salary_mid.is_not(None))
+    ).one()
+    if values is None:
+        return None
+    return {
+        name: float(value) for name, value in zip(SALARY_PERCENTILES, values)
+    }
+
+
+def get_market_insights(
+    session: Session, filters: JobInsightsRequest,
+    salary_ranges: Optional[list] = None
+) -> MarketInsightsResponse:
+    """
+    Market insights for the jobs matching the filters, with the salary
+    distribution over `salary_ranges` (MARKET_SALARY_RANGES by default).
+
+    Answered from the rollup tables when the filters allow it. Otherwise
+    everything is computed by a query grouped by company, job type and
+    salary range, and the percentiles by a second aggregate on Postgres,
+    so no `Job` rows or salaries are ever loaded.
+    """
+    if salary_ranges is None:
+        salary_ranges = MARKET_SALARY_RANGES
+    if _market_rollups_can_answer(filters, salary_ranges):
+        return _get_market_insights_from_rollups(session, filters)
+
+    salary_mid = (Job.salary_min + Job.salary_max) / 2
+    salary_bucket = _salary_bucket_expression(salary_ranges)
+    conditions = _market_insights_conditions(filters)
+
+    statement = (
+        select(
+            Client.company_name,
+            Job.job_type,
+            salary_bucket,
+            func.count(Job.id),
+            func.sum(salary_mid),
+            func.count(salary_mid),
+        )
+        .join(Client, Client.id == Job.client_id)
+        .where(*conditions)
+        .group_by(Client.company_name, Job.job_type, salary_bucket)
+    )
+    rows = session.exec(statement).all()
+    salary_percentiles = (
+        _salary_percentiles_sql(session, conditions) if rows else None
+    )
+
+    return _build_market_insights(rows, salary_ranges, salary_percentiles)
+
+
+SALARY_PERCENTILES = {"p10": 0.1, "p25": 0.25, "median": 0.5, "p75": 0.75, "p90": 0.9}
+
+# Same expressions as the ix_job_salary_segment index, the empty string is
+# inlined for Postgres to match the indexed expression.
+_SALARY_SEGMENT_COLUMNS = (
+    func.lower(func.trim(Job.title)),
+    func.coalesce(Job.location, literal_column("''")),
+    Job.job_type,
+)
+
+
+def _salary_segment(job: Job) -> tuple[str, str, str]:
+    """
+    (normalized title, location, job type) salary statistics segment of a job
+    """
+    return (
+        job.title.strip().lower(), job.location or "", _enum_value(job.job_type)
     )
 
 
+def _percentile(values: list, fraction: float):
+    """
+    Linear interpolation between the closest ranks of sorted `values`, the
+    same as Postgres' percentile_cont.
+    """
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * Decimal(position - lower)
+
+
+def _compute_salary_statistics(
+    session: Session, segment: tuple[str, str, str]
+) -> Optional[dict[str, Any]]:
+    """
+    Salary statistics of a segment from its active jobs with a salary, or
+    None when it has none.
+    """
+    title, location, job_type = segment
+    segment_title, segment_location, segment_job_type = _SALARY_SEGMENT_COLUMNS
+    return _salary_statistics(session, [
+        segment_title == title,
+        segment_location == location,
+        segment_job_type == job_type,
+        Job.status == "active",
+        Job.salary_min > 0,
+        Job.salary_max > 0,
+    ])
+
+
+def _salary_statistics(
+    session: Session, conditions: list
+) -> Optional[dict[str, Any]]:
+    """
+    Sample size, mean and `SALARY_PERCENTILES` of the salary midpoints of
+    the jobs matching `conditions`, or None when none has a salary.
+    """
+    salary_mid = (Job.salary_min + Job.salary_max) / 2
+    conditions = [*conditions, salary_mid.is_not(None)]
+
+    if session.get_bind().dialect.name == "postgresql":
+        row = session.exec(
+            select(
+                func.count(), func.avg(salary_mid),
+                *(
+                    func.percentile_cont(fraction).within_group(salary_mid)
+                    for fraction in SALARY_PERCENTILES.values()
+                ),
+            ).where(*conditions)
+        ).one()
+        sample_size, mean, *percentiles = row
+    else:
+        values = sorted(
+            Decimal(str(value))
+            for value in session.exec(select(salary_mid).where(*conditions))
+        )
+        sample_size = len(values)
+        mean = sum(values) / sample_size if values else None
+        percentiles = [
+            _percentile(values, fraction) if values else None
+            for fraction in SALARY_PERCENTILES.values()
+        ]
+
+    if not sample_size:
+        return None
+    return {
+        "sample_size": sample_size,
+        "mean": mean,
+        **dict(zip(SALARY_PERCENTILES, percentiles)),
+    }
+
+
+def _lock_salary_segments(
+    session: Session, segments: set[tuple[str, str, str]]
+) -> None:
+    """
+    Serializes the transactions recomputing the same segments until they
+    commit. A recomputation only sees committed jobs besides its own, so
+    without it two concurrent changes to a segment could each leave out
+    the other. Segments are locked in order so that transactions changing
+    two segments can't deadlock. Postgres only, SQLite serializes writers.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    for segment in sorted(segments):
+        key = "salary_statistics:" + "|".join(segment)
+        session.execute(select(
+            func.pg_advisory_xact_lock(func.hashtextextended(key, 0))
+        ))
+
+
+def refresh_salary_statistics(
+    *, session: Session, segments: set[tuple[str, str, str]]
+) -> None:
+    """
+    Recompute the salary statistics of `segments` from the job table, only
+    scanning their jobs. Runs inside the caller's transaction, after its
+    job changes are flushed.
+    """
+    _lock_salary_segments(session, segments)
+    for segment in segments:
+        title, location, job_type = segment
+        statistics = _compute_salary_statistics(session, segment)
+        if statistics is None:
+            session.execute(delete(SalaryStatistics).where(
+                SalaryStatistics.title == title,
+                SalaryStatistics.location == location,
+                SalaryStatistics.job_type == job_type,
+            ))
+            continue
+
+        insert = _dialect_insert(session)(SalaryStatistics).values(
+            id=uuid.uuid4(), title=title, location=location, job_type=job_type,
+            **statistics
+        )
+        session.execute(insert.on_conflict_do_update(
+            index_elements=["title", "location", "job_type"],
+            set_={
+                column: insert.excluded[column]
+                for column in ("updated_at", *statistics)
+            },
+        ))
+
+
+def rebuild_salary_statistics(session: Session) -> int:
+    """
+    Rebuild the salary statistics of every segment. Returns the number of
+    segments.
+    """
+    segments = session.exec(
+        select(*_SALARY_SEGMENT_COLUMNS).where(Job.status == "active").distinct()
+    ).all()
+    segments = {
+        (title, location, _enum_value(job_type))
+        for title, location, job_type in segments
+    }
+
+    session.execute(delete(SalaryStatistics))
+    refresh_salary_statistics(session=session, segments=segments)
+    session.commit()
+
+    return session.exec(select(func.count(SalaryStatistics.id))).one()
+
+
+def get_salary_statistics(
+    session: Session, job: Job
+) -> Optional[SalaryStatistics]:
+    title, location, job_type = _salary_segment(job)
+    return session.exec(
+        select(SalaryStatistics).where(
+            SalaryStatistics.title == title,
+            SalaryStatistics.location == location,
+            SalaryStatistics.job_type == job_type,
+        )
+    ).first()
+
+
 def create_job_application(
     *, session: Session, application_in: JobApplicationCreate
 ) -> JobApplication:
@@ -445,29 +1224,55 @@ def create_job_application(
     return db_application
 
 
-def get_job_applications(
-    session: Session, skip: int, limit: int
-) -> tuple[list[JobApplication], int]:
+# How job applications are hydrated with their job, client and candidate:
+# "joined" fetches them in the same query, "selectin" with one extra query
+# per relationship.
+LoadStrategy = Literal["joined", "selectin"]
 
-    statement = select(JobApplication).offset(skip).limit(limit)
-    applications = session.exec(statement).all()
 
-    total_count = session.exec(
-        select(func.count()).select_from(JobApplication)).one()
+def _job_application_options(
+    load: LoadStrategy, with_candidate: bool = True
+) -> list:
+    loader = joinedload if load == "joined" else selectinload
+    options = [loader(JobApplication.job).options(loader(Job.client))]
+    if with_candidate:
+        options.append(loader(JobApplication.candidate))
 
-    return applications, total_count
+    return options
+
+
+def get_job_applications(
+    session: Session, skip: int, limit: int,
+    load: LoadStrategy = "selectin", cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
+) -> Page:
+
+    statement = select(JobApplication)
+    applications, next_cursor = _paginate(
+        session,
+        statement.options(*_job_application_options(load, with_candidate=False)),
+        JobApplication, skip, limit, cursor
+    )
+
+    total_count, count_mode = _count(session, statement, count_mode)
+
+    return Page(applications, total_count, count_mode, next_cursor)
 
 
 def get_job_applications_by_job_id(
-    session: Session, job_id: uuid.UUID, skip: int, limit: int
-) -> tuple[list[JobApplication], int]:
+    session: Session, job_id: uuid.UUID, skip: int, limit: int,
+    load: LoadStrategy = "selectin", cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
+) -> Page:
     statement = select(JobApplication).where(JobApplication.job_id == job_id)
-    applications = session.exec(statement.offset(skip).limit(limit)).all()
+    applications, next_cursor = _paginate(
+        session, statement.options(*_job_application_options(load)),
+        JobApplication, skip, limit, cursor
+    )
 
-    total_count = session.exec(
-        select(func.count()).select_from(statement.subquery())).one()
+    total_count, count_mode = _count(session, statement, count_mode)
 
-    return applications, total_count
+    return Page(applications, total_count, count_mode, next_cursor)
 
 
 def get_job_application_by_id(session: Session, application_id=uuid.UUID):
@@ -476,17 +1281,56 @@ def get_job_application_by_id(session: Session, application_id=uuid.UUID):
 
 
 def get_job_applications_by_candidate_id(
-    session: Session, candidate_id: uuid.UUID, skip: int, limit: int
-) -> tuple[list[JobApplication], int]:
+    session: Session, candidate_id: uuid.UUID, skip: int, limit: int,
+    load: LoadStrategy = "selectin", cursor: Optional[str] = None,
+    count_mode: CountModeEnum = CountModeEnum.exact
+) -> Page:
     statement = select(JobApplication).where(
         JobApplication.candidate_id == candidate_id
     )
-    applications = session.exec(statement.offset(skip).limit(limit)).all()
+    applications, next_cursor = _paginate(
+        session, statement.options(*_job_application_options(load)),
+        JobApplication, skip, limit, cursor
+    )
+
+    total_count, count_mode = _count(session, statement, count_mode)
 
-    total_count = session.exec(
-        select(func.count()).select_from(statement.subquery())).one()
+    return Page(applications, total_count, count_mode, next_cursor)
 
-    return applications, total_count
+
+def build_job_applications_public(
+    applications: list[JobApplication], with_candidate: bool = True
+) -> list[JobApplicationPublic]:
+    """
+    Build `JobApplicationPublic` for a page of hydrated applications.
+
+    Jobs, clients and candidates shared by several applications are
+    serialized once and the same public object is reused for every row.
+    """
+    clients = {}
+    candidates = {}
+    jobs = {}
+
+    for application in applications:
+        job = application.job
+        if job.client_id not in clients and job.client:
+            clients[job.client_id] = ClientPublic.model_validate(job.client)
+        if job.id not in jobs:
+            jobs[job.id] = JobPublic(
+                **job.dict(), client_details=clients.get(job.client_id)
+            )
+        if with_candidate and application.candidate_id not in candidates:
+            candidates[application.candidate_id] = \
+                CandidatePublic.model_validate(application.candidate)
+
+    return [
+        JobApplicationPublic(
+            **application.dict(),
+            candidate_details=candidates.get(application.candidate_id),
+            job_details=jobs[application.job_id],
+        )
+        for application in applications
+    ]
 
 
 def update_job_application(
@@ -528,83 +1372,296 @@ def get_job_applications_status(
     return status
 
 
-def get_salary_recommendation_data(session: Session, candidate: Candidate):
+def get_job_applications_statuses(
+    session: Session, candidate_id: uuid.UUID, job_ids: list[uuid.UUID],
+) -> dict[uuid.UUID, str]:
     """
-    Calculating required parameters for Salary Recommendation
+    Fetch the application status of a candidate for many jobs at once,
+    keyed by job id. Jobs the candidate didn't apply to are left out.
     """
-    # Internal median salary
-    jobs, count = get_matching_jobs_for_candidate(
-        session=session, candidate=candidate, skip=0, limit=100
+    if not job_ids:
+        return {}
+
+    statement = select(JobApplication.job_id, JobApplication.status).where(
+        JobApplication.candidate_id == candidate_id,
+        JobApplication.job_id.in_(job_ids),
     )
-    salaries = [(job.salary_min + job.salary_max) / 2 \
-        for job in jobs if job.salary_min and job.salary_max]
-    I = int(sum(salaries) / len(salaries) if salaries else 0)
+    return dict(session.exec(statement).all())
 
-    # Candidate Skills Profiency, Weight and Market Premium
-    candidate_key_skills = [skill['name'] for skill in candidate.key_skills]
-    if not candidate_key_skills:
-        raise HTTPException(status_code=422, detail="Candidate key skills not found")
 
-    skills_data = session.exec(
-        select(Skills).where(Skills.name.in_(candidate_key_skills))
-    ).all()
-    if not skills_data:
-        raise HTTPException(status_code=422, detail="Candidate key skills not found")
+def build_jobs_public(
+    session: Session, jobs: list[Job],
+    candidate_id: Optional[uuid.UUID] = None
+) -> list[JobPublic]:
+    """
+    Build `JobPublic` for a page of jobs with their client details and the
+    candidate's application status.
+
+    Statuses are fetched in a single query and each client is serialized
+    once, clients should be eager loaded by the caller.
+    """
+    statuses = get_job_applications_statuses(
+        session=session, candidate_id=candidate_id,
+        job_ids=[job.id for job in jobs]
+    ) if candidate_id else {}
+
+    clients = {}
+    for job in jobs:
+        if job.client_id not in clients and job.client:
+            clients[job.client_id] = ClientPublic.model_validate(job.client)
+
+    return [
+        JobPublic(
+            **job.dict(),
+            client_details=clients.get(job.client_id),
+            application_status=statuses.get(job.id),
+        )
+        for job in jobs
+    ]
 
-    skill_proficiency = [skill["proficiency"] for skill in candidate.key_skills]
-    skill_weights = [skill.weight for skill in skills_data]
-    market_premiums = [skill.market_premium for skill in skills_data]
 
+def _internal_median_salaries(
+    session: Session, jobs: list[Job]
+) -> dict[uuid.UUID, int]:
+    """
+    Median salary midpoint of the active jobs in each job's salary
+    statistics segment, or the job's own midpoint when there are none, by
+    job id. The statistics of all the segments are read in one query, they
+    are kept current by every job change so nothing is cached here.
+
+    The internal median prices the job being recommended for: it comes
+    from the jobs with the same normalized title, location and job type,
+    whoever the candidate is. It used to be the average midpoint of the
+    jobs matching the candidate (`get_matching_jobs_for_candidate`), so
+    candidates of one job got different medians.
+    """
+    segments = {_salary_segment(job) for job in jobs}
+    medians = {
+        (title, location, job_type): median
+        for title, location, job_type, median in session.exec(
+            select(
+                SalaryStatistics.title, SalaryStatistics.location,
+                SalaryStatistics.job_type, SalaryStatistics.median,
+            ).where(
+                tuple_(
+                    SalaryStatistics.title, SalaryStatistics.location,
+                    SalaryStatistics.job_type,
+                ).in_(segments)
+            )
+        )
+    }
+
+    internal_medians = {}
+    for job in jobs:
+        internal_median = medians.get(_salary_segment(job))
+        if internal_median is None and job.salary_min and job.salary_max:
+            internal_median = (job.salary_min + job.salary_max) / 2
+        internal_medians[job.id] = int(internal_median or 0)
+    return internal_medians
+
+
+def get_market_context(
+    candidate: Candidate, internal_median: int
+) -> MarketContext:
+    """
+    Candidate independent salary recommendation inputs for a job with
+    `internal_median` in the candidate's location and industries, from the
+    cached reference data
+    """
     # Candidate location multiplier
-    location_data = session.exec(
-        select(Locations).where(Locations.city == candidate.location)
-    ).first()
-    if not location_data:
+    location_multiplier = reference_data.location_multiplier(candidate.location)
+    if location_multiplier is None:
         raise HTTPException(status_code=422, detail="Candidate location not found")
 
-    location_multiplier = location_data.location_multiplier \
-        if location_data.location_multiplier else 1.1
+    location_multiplier = location_multiplier if location_multiplier else 1.1
 
     # Candidate Industry Trends
-    industry_data = session.exec(
-        select(Industry).where(Industry.industry.in_(candidate.industries_of_interest))
-    ).first()
-    if not industry_data:
+    trends = (
+        reference_data.industry_trend(industry)
+        for industry in candidate.industries_of_interest or []
+    )
+    trend_percentage = next(
+        (trend for trend in trends if trend is not None), None
+    )
+    if trend_percentage is None:
         raise HTTPException(status_code=422, detail="Candidate industries of interest not found")
 
-    trend_percentage = industry_data.trend_percentage \
-        if industry_data.trend_percentage else 3
-
-    # Todo: Make all these values dynamic
-    Wi = 0.4 # Internal weight
-    E = 52000 # External market salary
-    We = 0.5 # External weight
+    trend_percentage = trend_percentage if trend_percentage else 3
 
-    C = 5000 # Customization factor
-    Wc = 0.1 # Customization weight
+    return MarketContext(
+        internal_median=internal_median,
+        location_multiplier=location_multiplier,
+        trend_percentage=trend_percentage,
+    )
 
-    risk_percentage = 5 # Risk premium percentage
-    benefits = 10000 # Value of benefits/equity
 
-    transparency_score = 4 # Transparency score (1–5)
-    transparency_weight = 0.02 # Weight for transparency
+# Proficiency of skills found in the resume but not listed in the profile,
+# where the candidate rates them from 0 to 5
+RESUME_SKILL_PROFICIENCY = 1
 
-    equity_score = 4 # Diversity and equity score (1–5)
-    diversity_premium = 2000 # Premium for diversity
 
-    flexibility_score = 3 # Flexibility score (1–5)
-    flexibility_multiplier = 1500 # Flexibility multiplier
+def get_candidate_skill_inputs(
+    candidate: Candidate, resume_skills: list[str] = ()
+) -> list[SkillInput]:
+    """
+    Candidate Skills Profiency, Weight and Market Premium
+    """
+    proficiencies = {
+        skill: RESUME_SKILL_PROFICIENCY for skill in resume_skills
+    }
+    proficiencies.update(
+        (skill["name"], skill["proficiency"])
+        for skill in candidate.key_skills or []
+    )
 
-    well_being_value = 3000 # Well-being benefits value
+    skills = []
+    for name, proficiency in proficiencies.items():
+        coefficients = reference_data.skill(name)
+        if coefficients:
+            skills.append(SkillInput(
+                proficiency, coefficients.weight,
+                coefficients.market_premium
+            ))
+    if not skills:
+        raise HTTPException(status_code=422, detail="Candidate key skills not found")
+    return skills
 
-    functional_multiplier = 1.05 # Industry adjustment (e.g., 5% increase)
-    market_demand_multiplier = 1.03 # Market demand adjustment (e.g., 3% increase)
 
+def get_salary_recommendation_data(
+    session: Session, job: Job, candidate: Candidate
+) -> tuple[MarketContext, list[SkillInput]]:
+    """
+    Calculating required parameters for Salary Recommendation
+    """
+    reference_data.ensure_fresh(session)
+    resume_skills = get_candidate_resume_skills(
+        session=session, candidate_ids=[candidate.id]
+    )
+    internal_median = _internal_median_salaries(session, [job])[job.id]
     return (
-        I, Wi, E, We, skill_proficiency, skill_weights, market_premiums,
-        location_multiplier, trend_percentage, C, Wc, risk_percentage,
-        benefits, transparency_score, transparency_weight,
-        equity_score, diversity_premium, flexibility_score,
-        flexibility_multiplier, well_being_value, functional_multiplier,
-        market_demand_multiplier
+        get_market_context(candidate, internal_median),
+        get_candidate_skill_inputs(candidate, resume_skills.get(candidate.id, []))
+    )
+
+
+def get_salary_recommendation_batch_data(
+    session: Session, job: Job, candidate_ids: list[uuid.UUID]
+) -> tuple[dict[uuid.UUID, tuple], dict[uuid.UUID, str]]:
+    """
+    `get_salary_recommendation_data` for many candidates, with one query
+    for the candidates, one for their resume skills and one for the salary
+    statistics. Returns the parameters by candidate id, and the error by id
+    of the candidates they can't be calculated for.
+    """
+    reference_data.ensure_fresh(session)
+    candidates = session.exec(
+        select(Candidate).where(Candidate.id.in_(candidate_ids))
+    ).all()
+    resume_skills = get_candidate_resume_skills(
+        session=session, candidate_ids=candidate_ids
+    )
+    internal_median = _internal_median_salaries(session, [job])[job.id]
+
+    parameters, errors = {}, {}
+    for candidate in candidates:
+        try:
+            parameters[candidate.id] = (
+                get_market_context(candidate, internal_median),
+                get_candidate_skill_inputs(
+                    candidate, resume_skills.get(candidate.id, [])
+                )
+            )
+        except HTTPException as e:
+            errors[candidate.id] = e.detail
+
+    for candidate_id in candidate_ids:
+        if candidate_id not in parameters and candidate_id not in errors:
+            errors[candidate_id] = "Candidate not found"
+
+    return parameters, errors
+
+
+##################################################
+#                                                #
+#                 Email outbox                   #
+#                                                #
+##################################################
+
+def enqueue_email(
+    *, session: Session, email_to: str, subject: str, html_content: str
+) -> EmailOutbox:
+    email = EmailOutbox(
+        email_to=email_to, subject=subject, html_content=html_content
     )
+    session.add(email)
+    session.commit()
+    session.refresh(email)
+    return email
+
+
+def claim_due_emails(
+    *, session: Session, limit: int, now: datetime.datetime,
+    lease_until: datetime.datetime, max_attempts: int
+) -> list[EmailOutbox]:
+    """
+    Up to `limit` pending emails due at `now`, oldest first, counting an
+    attempt for each. They aren't due again before `lease_until`, so other
+    workers skip them while they are being sent. On Postgres, concurrent
+    claims skip the rows locked by each other instead of waiting.
+
+    Emails already attempted `max_attempts` times are given up on instead
+    of returned: their lease expired without a result, the worker sending
+    them died, and retrying them forever could crash it again.
+    """
+    statement = (
+        select(EmailOutbox)
+        .where(
+            EmailOutbox.status == "pending",
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+    )
+    if session.get_bind().dialect.name == "postgresql":
+        statement = statement.with_for_update(skip_locked=True)
+
+    claimed = []
+    for email in session.exec(statement).all():
+        if email.attempts >= max_attempts:
+            email.status = "failed"
+            email.last_error = (
+                f"No result after {email.attempts} attempts, the lease expired"
+            )
+        else:
+            email.attempts += 1
+            email.next_attempt_at = lease_until
+            claimed.append(email)
+        session.add(email)
+    session.commit()
+    return claimed
+
+
+def record_email_sent(
+    *, session: Session, email: EmailOutbox, sent_at: datetime.datetime
+) -> None:
+    email.status = "sent"
+    email.sent_at = sent_at
+    email.last_error = None
+    session.add(email)
+    session.commit()
+
+
+def record_email_failure(
+    *, session: Session, email: EmailOutbox, error: str, retry_at: Optional[datetime.datetime]
+) -> None:
+    """
+    Schedules another attempt at `retry_at`, or gives up on the email when
+    it is `None`.
+    """
+    if retry_at is None:
+        email.status = "failed"
+    else:
+        email.next_attempt_at = retry_at
+    email.last_error = error
+    session.add(email)
+    session.commit()
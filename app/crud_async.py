@@ -0,0 +1,172 @@
+"""
+Async variants of the `app.crud` functions used by async routes.
+
+Simple lookups and updates are ported as is on the AsyncSession, reusing
+the same statements. The job listing, search and insights functions run
+the sync implementation with `AsyncSession.run_sync`: their queries still
+go through the async driver, in SQLAlchemy's greenlet bridge, so they
+don't block the event loop and don't need a threadpool, and the logic
+isn't duplicated.
+"""
+import functools
+import uuid
+from typing import Callable, Optional
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+from app.core.security import (
+    get_password_hash_async,
+    verify_and_update_password_async,
+)
+from app.models import Candidate, Client, Job
+from app.api.schemas.candidates import CandidateCreate, CandidateUpdate
+from app.api.schemas.clients import ClientUpdate
+
+
+def _run_sync(function: Callable) -> Callable:
+    """
+    Async variant of a `crud` function taking a `session` keyword.
+    """
+    @functools.wraps(function)
+    async def wrapper(*args, session: AsyncSession, **kwargs):
+        return await session.run_sync(
+            lambda sync_session: function(*args, session=sync_session, **kwargs)
+        )
+
+    return wrapper
+
+
+async def _check_password(
+    session: AsyncSession, user: Candidate | Client, password: str
+) -> bool:
+    if not user.hashed_password:
+        return False
+    verified, new_hash = await verify_and_update_password_async(
+        password, user.hashed_password
+    )
+    if verified and new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+    return verified
+
+
+##### Candidates #####
+
+async def create_candidate(
+    *, session: AsyncSession, candidate_in: CandidateCreate
+) -> Candidate:
+    db_candidate = Candidate.model_validate(candidate_in)
+    if candidate_in.password:
+        db_candidate = Candidate.model_validate(
+            candidate_in, update={
+                "hashed_password": await get_password_hash_async(
+                    candidate_in.password
+                )}
+        )
+    session.add(db_candidate)
+    await session.commit()
+    await session.refresh(db_candidate)
+
+    return db_candidate
+
+
+async def authenticate_candidate(
+    *, session: AsyncSession, email: str, password: str
+) -> Candidate | None:
+    candidate = await get_candidate_by_email(session=session, email=email)
+    if candidate and await _check_password(session, candidate, password):
+        return candidate
+
+    return None
+
+
+async def update_candidate(
+    *, session: AsyncSession, db_candidate: Candidate,
+    candidate_in: CandidateUpdate
+) -> Candidate:
+    candidate_data = candidate_in.model_dump(exclude_unset=True)
+    db_candidate.sqlmodel_update(candidate_data)
+
+    session.add(db_candidate)
+    await session.commit()
+    await session.refresh(db_candidate)
+
+    return db_candidate
+
+
+async def get_candidate_by_email(
+    *, session: AsyncSession, email: str
+) -> Candidate | None:
+    statement = select(Candidate).where(Candidate.email == email)
+    return (await session.exec(statement)).first()
+
+
+async def get_candidate_by_phone_number(
+    *, session: AsyncSession, phone_number: str
+) -> Candidate | None:
+    statement = select(Candidate).where(
+        Candidate.phone_number == phone_number
+    )
+    return (await session.exec(statement)).first()
+
+
+##### Clients #####
+
+async def authenticate_client(
+    *, session: AsyncSession, email: str, password: str
+) -> Client | None:
+    client = await get_client_by_email(session=session, email=email)
+    if client and await _check_password(session, client, password):
+        return client
+
+    return None
+
+
+async def update_client(
+    *, session: AsyncSession, db_client: Client, client_in: ClientUpdate
+) -> Client:
+    client_data = client_in.model_dump(exclude_unset=True)
+    db_client.sqlmodel_update(client_data)
+    session.add(db_client)
+    await session.commit()
+    await session.refresh(db_client)
+
+    return db_client
+
+
+async def get_client_by_email(*, session: AsyncSession, email: str) -> Client | None:
+    statement = select(Client).where(Client.email == email)
+    return (await session.exec(statement)).first()
+
+
+async def get_client_by_phone_number(
+    *, session: AsyncSession, phone_number: str
+) -> Client | None:
+    statement = select(Client).where(
+        Client.contact_phone_number == phone_number
+    )
+    return (await session.exec(statement)).first()
+
+
+##### Jobs #####
+
+async def get_job_by_id(
+    *, session: AsyncSession, job_id: uuid.UUID
+) -> Optional[Job]:
+    """
+    The job with its client loaded, which can't be lazy loaded later on.
+    """
+    return await session.get(Job, job_id, options=[selectinload(Job.client)])
+
+
+get_jobs = _run_sync(crud.get_jobs)
+get_jobs_by_client = _run_sync(crud.get_jobs_by_client)
+search_jobs = _run_sync(crud.search_jobs)
+get_matching_jobs_for_candidate = _run_sync(crud.get_matching_jobs_for_candidate)
+get_job_applications_statuses = _run_sync(crud.get_job_applications_statuses)
+build_jobs_public = _run_sync(crud.build_jobs_public)
+get_market_insights = _run_sync(crud.get_market_insights)
@@ -0,0 +1,158 @@
+"""
+Outbox of the emails sent by the API.
+
+Routes queue emails in the email_outbox table (`crud.enqueue_email`) and
+return without waiting on the SMTP server. A worker thread in each API
+process sends the due emails in batches of EMAIL_OUTBOX_BATCH_SIZE, all
+over one SMTP connection, and retries the failed ones with exponential
+backoff. It wakes up as soon as a session of its process commits an email,
+and every EMAIL_OUTBOX_POLL_SECONDS for the emails of other processes.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from emails.backend.smtp import SMTPBackend
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.models import EmailOutbox
+from app.utils import email_message, smtp_options
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Seconds to wait before the next attempt at an email that failed
+    `attempts` times.
+    """
+    return min(
+        settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+    )
+
+
+def _response_error(response) -> Optional[str]:
+    if response is None:
+        return "No recipient"
+    if response.success:
+        return None
+    if response.error is not None:
+        return repr(response.error)
+    return f"{response.last_command}: {response.status_code} {response.status_text!r}"
+
+
+class EmailOutboxWorker:
+    """
+    Background thread sending the emails queued in the outbox, see the
+    module docstring.
+    """
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.failed = 0
+        self._engine: Optional[Engine] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self, engine: Engine) -> None:
+        self._engine = engine
+        if not settings.emails_enabled:
+            logger.info("Emails aren't configured, queued emails won't be sent")
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def send_due_emails(self) -> int:
+        """
+        Sends batches of due emails until there are none left, reusing one
+        SMTP connection. Returns how many emails were attempted.
+        """
+        attempted = 0
+        # The connection is only opened once there's something to send
+        with SMTPBackend(**smtp_options()) as backend, Session(
+            self._engine, expire_on_commit=False
+        ) as session:
+            while not self._stop.is_set():
+                batch = self.send_batch(session, backend)
+                attempted += batch
+                if batch < settings.EMAIL_OUTBOX_BATCH_SIZE:
+                    break
+        return attempted
+
+    def send_batch(self, session: Session, backend: SMTPBackend) -> int:
+        now = datetime.utcnow()
+        emails = crud.claim_due_emails(
+            session=session,
+            limit=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            now=now,
+            lease_until=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS),
+            max_attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        )
+        for email in emails:
+            message = email_message(
+                subject=email.subject, html_content=email.html_content
+            )
+            error = _response_error(message.send(to=email.email_to, smtp=backend))
+            if error is None:
+                self.sent += 1
+                crud.record_email_sent(
+                    session=session, email=email, sent_at=datetime.utcnow()
+                )
+                continue
+
+            self.failed += 1
+            retry_at = None
+            if email.attempts < settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                retry_at = datetime.utcnow() + timedelta(
+                    seconds=retry_delay(email.attempts)
+                )
+            logger.warning(
+                "Unable to send email %s (attempt %s): %s",
+                email.id, email.attempts, error,
+            )
+            crud.record_email_failure(
+                session=session, email=email, error=error, retry_at=retry_at
+            )
+        return len(emails)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.send_due_emails()
+            except Exception:
+                logger.exception("Unable to send queued emails")
+            self._wake.wait(settings.EMAIL_OUTBOX_POLL_SECONDS)
+
+
+email_outbox = EmailOutboxWorker()
+
+
+@event.listens_for(SASession, "after_flush")
+def _track_queued_emails(session, flush_context) -> None:
+    if any(isinstance(instance, EmailOutbox) for instance in session.new):
+        session.info["email_queued"] = True
+
+
+@event.listens_for(SASession, "after_commit")
+def _wake_email_outbox(session) -> None:
+    if session.info.pop("email_queued", False):
+        email_outbox.wake()
@@ -0,0 +1,159 @@
+"""
+Avatar variants: square thumbnails in the original format and in WebP,
+and a full size WebP copy, stored next to the original avatar.
+
+Images are decoded and encoded in a pool of worker processes, started
+from a background task once the upload's response has been sent.
+"""
+import asyncio
+import io
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.storage import storage
+from app.models import Candidate, Client
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = (64, 256)
+
+# Pillow format names of the avatar extensions save_file accepts
+IMAGE_FORMATS = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def variant_extensions(extension: str) -> dict[str, str]:
+    """
+    Extension of each variant of an image with `extension`.
+    """
+    variants = {"webp": "webp"}
+    for size in THUMBNAIL_SIZES:
+        variants[f"thumbnail_{size}"] = extension
+        variants[f"thumbnail_{size}_webp"] = "webp"
+    return variants
+
+
+def variant_key(key: str, name: str, extension: str) -> str:
+    """
+    Key of the `name` variant of the image stored under `key`. Variants of
+    content addressed images are content addressed too.
+    """
+    return f"{key.rsplit('.', 1)[0]}_{name}.{extension}"
+
+
+def _encode(image, extension: str) -> bytes:
+    image_format = IMAGE_FORMATS[extension]
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    output = io.BytesIO()
+    image.save(output, format=image_format, quality=85)
+    return output.getvalue()
+
+
+def render_avatar_variants(data: bytes, extension: str) -> dict[str, bytes]:
+    """
+    Encoded variants of the image in `data`. CPU bound, runs in the worker
+    processes.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    rendered = {}
+    for name, variant_extension in variant_extensions(extension).items():
+        if name == "webp":
+            variant = image
+        else:
+            size = int(name.split("_")[1])
+            variant = ImageOps.fit(
+                image, (size, size), method=Image.Resampling.LANCZOS
+            )
+        rendered[name] = _encode(variant, variant_extension)
+    return rendered
+
+
+def _image_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+
+def _put_bytes(key: str, content: bytes) -> None:
+    path = storage.staging_path()
+    try:
+        with open(path, "wb") as f:
+            f.write(content)
+        storage.put(key, path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def generate_avatar_variants(key: str) -> dict[str, str]:
+    """
+    Renders and stores the variants of the avatar stored under `key`,
+    returning their URLs by name. Variants already stored, from an earlier
+    upload of the same image, aren't rendered again.
+    """
+    extension = key.rsplit(".", 1)[-1]
+    if extension not in IMAGE_FORMATS:
+        return {}
+
+    keys = {
+        name: variant_key(key, name, variant_extension)
+        for name, variant_extension in variant_extensions(extension).items()
+    }
+    stored = await run_in_threadpool(
+        lambda: all(storage.exists(variant) for variant in keys.values())
+    )
+    if not stored:
+        data = await run_in_threadpool(storage.read, key)
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            _image_executor(), render_avatar_variants, data, extension
+        )
+        for name, content in rendered.items():
+            await run_in_threadpool(_put_bytes, keys[name], content)
+
+    return {name: storage.url(variant) for name, variant in keys.items()}
+
+
+def _save_avatar_variants(
+    model: type[Union[Candidate, Client]], user_id: uuid.UUID,
+    avatar: str, variants: dict[str, str]
+) -> None:
+    with Session(engine) as session:
+        user = session.get(model, user_id)
+        # Skipped when another avatar was uploaded meanwhile
+        if user and user.avatar == avatar:
+            user.avatar_variants = variants
+            session.add(user)
+            session.commit()
+
+
+async def process_avatar(
+    model: type[Union[Candidate, Client]], user_id: uuid.UUID, key: str
+) -> None:
+    """
+    Background task generating the variants of a user's new avatar.
+    """
+    try:
+        variants = await generate_avatar_variants(key)
+    except Exception:
+        logger.exception("Unable to generate the variants of avatar %s", key)
+        return
+    if variants:
+        await run_in_threadpool(
+            _save_avatar_variants, model, user_id, storage.url(key), variants
+        )
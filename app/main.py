@@ -1,12 +1,18 @@
 import os
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
-from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.routes import uploads
 from app.core.config import settings
+from app.core.db import engine
+from app.email_outbox import email_outbox
+from app.reference_data import reference_data
+from app.utils import RequestSizeLimitMiddleware
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -16,6 +22,14 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    reference_data.start(engine)
+    email_outbox.start(engine)
+    yield
+    email_outbox.stop(timeout=5)
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.DESCRIPTION,
@@ -23,9 +37,13 @@ app = FastAPI(
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
-# Set all CORS enabled origins
+app.add_middleware(RequestSizeLimitMiddleware)
+
+# Set all CORS enabled origins, outside of the other middlewares so their
+# error responses also get the CORS headers
 if settings.all_cors_origins:
     app.add_middleware(
         CORSMiddleware,
@@ -37,8 +55,10 @@ if settings.all_cors_origins:
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
-# Create the uploads directory if it does not exist
-if not os.path.exists("uploads"):
-    os.makedirs("uploads")
+# Serve uploads stored on the local disk
+if settings.STORAGE_BACKEND == "local":
+    # Create the uploads directory if it does not exist
+    if not os.path.exists(settings.UPLOADS_DIR):
+        os.makedirs(settings.UPLOADS_DIR)
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+    app.include_router(uploads.router, tags=["uploads"])
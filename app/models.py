@@ -1,11 +1,13 @@
 import uuid
+from decimal import Decimal
 from pydantic import EmailStr
 from typing import List, Optional
-from sqlmodel import Field, Relationship, SQLModel, Column, DateTime
+from sqlmodel import Field, Relationship, SQLModel, Column, DateTime, Index, JSON, UniqueConstraint, text
 from app.api.schemas.utils import RequestDemoBase
 from app.api.schemas.candidates import CandidateBase
 from app.api.schemas.clients import ClientBase
 from app.api.schemas.jobs import JobBase, JobApplicationBase
+from app.search import search_document_sql
 from datetime import datetime
 
 
@@ -18,6 +20,8 @@ class RequestDemo(RequestDemoBase, table=True):
 class Client(ClientBase, table=True):
     __tablename__ = "client_profile"
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Thumbnail and WebP URLs of the avatar by variant name
+    avatar_variants: Optional[dict] = Field(default=None, sa_column=Column(JSON))
     hashed_password: Optional[str] = Field(default=None)
     is_super_user: bool = False
     is_active: bool = True
@@ -30,6 +34,8 @@ class Client(ClientBase, table=True):
 class Candidate(CandidateBase, table=True):
     __tablename__ = "candidate_profile"
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Thumbnail and WebP URLs of the avatar by variant name
+    avatar_variants: Optional[dict] = Field(default=None, sa_column=Column(JSON))
     hashed_password: Optional[str] = Field(default=None)
     is_active: bool = True
     mfa_enabled: bool = True
@@ -48,8 +54,47 @@ class SocialProvider(SQLModel, table=True):
     provider_id: str = Field(default=None)
 
 
+# Text columns of a job matched by the job search, and their rank weights
+JOB_SEARCH_COLUMNS = ("title", "location", "requirements")
+JOB_SEARCH_WEIGHTS = (2, 1, 1)
+
+
 class Job(JobBase, table=True):
     __tablename__ = "job"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_job_created_at_id", "created_at", "id"),
+        # Full-text search document and trigram indexes for the ILIKE
+        # substring filters, Postgres only (needs the pg_trgm extension)
+        Index(
+            "ix_job_search_document",
+            text(search_document_sql(
+                JOB_SEARCH_COLUMNS, weights=JOB_SEARCH_WEIGHTS
+            )),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        *(
+            Index(
+                f"ix_job_{column}_trgm", column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            ).ddl_if(dialect="postgresql")
+            for column in JOB_SEARCH_COLUMNS
+        ),
+        # Salary statistics segment, see SalaryStatistics
+        Index(
+            "ix_job_salary_segment",
+            text("lower(trim(title))"), text("coalesce(location, '')"),
+            "job_type",
+        ),
+        # Market insights rollup segment, less the salary bucket, for the
+        # digest rebuilds after job updates and deletes
+        Index(
+            "ix_job_market_rollup_segment",
+            "client_id", "job_type", "workplace_type", "status",
+            text("coalesce(location, '')"),
+        ),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     client_id: uuid.UUID = Field(foreign_key="client_profile.id")
     client: Client = Relationship(back_populates="jobs")
@@ -60,6 +105,10 @@ class Job(JobBase, table=True):
 
 class JobApplication(JobApplicationBase, table=True):
     __tablename__ = "job_application"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_job_application_created_at_id", "created_at", "id"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     job_id: uuid.UUID = Field(foreign_key="job.id")
     job: Job = Relationship(back_populates="job_applications")
@@ -89,3 +138,98 @@ class Industry(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     industry: str = Field(unique=True, max_length=255)
     trend_percentage: float = Field(default=2.4, ge=0)
+
+
+class MarketInsightsRollup(SQLModel, table=True):
+    """
+    Job counts, salary sums and salary digests per market segment, kept up
+    to date as jobs are created, updated and deleted so market insights
+    don't need to scan the job table.
+    """
+    __tablename__ = "market_insights_rollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "location", "job_type", "workplace_type", "status",
+            "salary_bucket", "client_id",
+            name="uq_market_insights_rollup_segment"
+        ),
+    )
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    location: str = Field(default="", max_length=255)
+    job_type: str = Field(max_length=50)
+    workplace_type: str = Field(max_length=50)
+    status: str = Field(max_length=50)
+    salary_bucket: int = Field(default=-1)
+    client_id: uuid.UUID = Field(foreign_key="client_profile.id", ondelete="CASCADE")
+    job_count: int = Field(default=0)
+    salary_sum: Decimal = Field(default=0)
+    salary_count: int = Field(default=0)
+    # Serialized TDigest of the segment's salary midpoints
+    salary_digest: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+
+
+class SalaryStatistics(SQLModel, table=True):
+    """
+    Distribution of the salary midpoints of the active jobs per market
+    segment (normalized title, location, job type). The segments a job
+    belongs to before and after a change are recomputed with it.
+    """
+    __tablename__ = "salary_statistics"
+    __table_args__ = (
+        UniqueConstraint(
+            "title", "location", "job_type",
+            name="uq_salary_statistics_segment"
+        ),
+    )
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    title: str = Field(max_length=255)
+    location: str = Field(default="", max_length=255)
+    job_type: str = Field(max_length=50)
+    sample_size: int = Field(default=0)
+    mean: Decimal = Field(default=0)
+    p10: Decimal = Field(default=0)
+    p25: Decimal = Field(default=0)
+    median: Decimal = Field(default=0)
+    p75: Decimal = Field(default=0)
+    p90: Decimal = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column=Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow))
+
+
+class CandidateResumeSkill(SQLModel, table=True):
+    """
+    Skills of the skill table found in a candidate's resume, with how many
+    times they appear. Rebuilt in the background when a new resume is
+    uploaded, used by job matching and salary recommendations.
+    """
+    __tablename__ = "candidate_resume_skill"
+    __table_args__ = (
+        Index("ix_candidate_resume_skill_skill", "skill"),
+    )
+    candidate_id: uuid.UUID = Field(
+        foreign_key="candidate_profile.id", primary_key=True, ondelete="CASCADE"
+    )
+    skill: str = Field(primary_key=True, max_length=255)
+    occurrences: int = Field(default=1)
+
+
+class EmailOutbox(SQLModel, table=True):
+    """
+    Emails queued by the API, sent in the background by the outbox worker
+    (app/email_outbox.py). Sent and given up emails are kept with their
+    last error for troubleshooting.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    email_to: str = Field(max_length=255)
+    subject: str = Field(default="")
+    html_content: str = Field(default="")
+    # pending, sent or failed
+    status: str = Field(default="pending", max_length=20)
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = Field(default=None)
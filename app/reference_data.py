@@ -0,0 +1,281 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import Industry, Locations, Skills
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_MODELS = (Skills, Locations, Industry)
+
+
+class AutocompleteIndex:
+    """
+    Ranked completions over a small set of names.
+
+    Prefix matches come from a sorted array of the lowercased names, other
+    substring matches from a map of the names' 2 and 3-grams. Results are
+    ranked exact match, then prefix, then word start, then any substring.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, Any]] = ()) -> None:
+        self._names: list[str] = []
+        self._values: list[Any] = []
+        self._grams: dict[str, set[int]] = defaultdict(set)
+
+        for name, value in entries:
+            index = len(self._names)
+            name = name.lower()
+            self._names.append(name)
+            self._values.append(value)
+            for size in (2, 3):
+                for start in range(len(name) - size + 1):
+                    self._grams[name[start:start + size]].add(index)
+
+        self._sorted = sorted(
+            (name, index) for index, name in enumerate(self._names)
+        )
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def search(self, query: str, limit: int) -> list[Any]:
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        prefixed = []
+        for name, index in self._sorted[bisect_left(self._sorted, (query,)):]:
+            if not name.startswith(query):
+                break
+            prefixed.append(index)
+        prefixed.sort(key=lambda index: (len(self._names[index]), self._names[index]))
+        matches = prefixed[:limit]
+
+        if len(matches) < limit:
+            seen = set(prefixed)
+            others = [
+                index for index in self._candidates(query)
+                if index not in seen and query in self._names[index]
+            ]
+            others.sort(key=lambda index: self._substring_rank(index, query))
+            matches += others[:limit - len(matches)]
+
+        return [self._values[index] for index in matches]
+
+    def _candidates(self, query: str) -> Iterable[int]:
+        if len(query) < 2:
+            return range(len(self._names))
+
+        size = min(len(query), 3)
+        postings = sorted(
+            (
+                self._grams.get(query[start:start + size], set())
+                for start in range(len(query) - size + 1)
+            ),
+            key=len,
+        )
+        return set.intersection(*postings)
+
+    def _substring_rank(self, index: int, query: str) -> tuple:
+        name = self._names[index]
+        position = name.find(query)
+        at_word_start = not name[position - 1].isalnum()
+        return (not at_word_start, position, len(name), name)
+
+
+@dataclass(frozen=True)
+class SkillCoefficients:
+    weight: float
+    market_premium: float
+
+
+class ReferenceData:
+    """
+    Per-worker snapshot of the skills, locations and industries reference
+    tables, so typeahead searches and salary recommendations never hit the
+    database for them.
+
+    Loaded at startup, the snapshot is rebuilt in a background thread when
+    a session commits changes to the tables or when it is older than
+    REFERENCE_DATA_REFRESH_SECONDS (to pick up other workers' changes).
+    Lookups keep answering from the previous snapshot meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self.skills = AutocompleteIndex()
+        self.locations = AutocompleteIndex()
+        self.industries = AutocompleteIndex()
+        self.skill_coefficients: dict[str, SkillCoefficients] = {}
+        self.location_multipliers: dict[str, float] = {}
+        self.industry_trends: dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._engine: Optional[Engine] = None
+        self._version = 0
+        self._loaded_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def start(self, engine: Engine) -> None:
+        self._engine = engine
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Unable to load reference data")
+
+    def load(self, session: Session) -> None:
+        version = self._version
+        skills = session.exec(select(Skills)).all()
+        locations = session.exec(select(Locations)).all()
+        industries = session.exec(select(Industry)).all()
+
+        self.skills = AutocompleteIndex(
+            (skill.name, skill.name) for skill in skills
+        )
+        self.locations = AutocompleteIndex(
+            (location.city, location.model_dump()) for location in locations
+        )
+        self.industries = AutocompleteIndex(
+            (industry.industry, industry.model_dump()) for industry in industries
+        )
+        self.skill_coefficients = {
+            skill.name: SkillCoefficients(skill.weight, skill.market_premium)
+            for skill in skills
+        }
+        self.location_multipliers = {
+            location.city: location.location_multiplier for location in locations
+        }
+        self.industry_trends = {
+            industry.industry: industry.trend_percentage for industry in industries
+        }
+        self.reloads += 1
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+
+    def reload(self) -> None:
+        with Session(self._engine) as session:
+            self.load(session)
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._reload_in_background()
+
+    def ensure_fresh(self, session: Optional[Session] = None) -> None:
+        if self._loaded_version is None:
+            # Nothing to answer from yet, only happens on a cold start
+            if session is not None:
+                self.load(session)
+            elif self._engine is not None:
+                self.reload()
+            return
+
+        expired = (
+            time.monotonic() - self._loaded_at
+            > settings.REFERENCE_DATA_REFRESH_SECONDS
+        )
+        if expired or self._loaded_version != self._version:
+            self._reload_in_background()
+
+    async def ensure_fresh_async(self) -> None:
+        """
+        `ensure_fresh` for async routes: the cold start load, when the
+        lifespan couldn't warm the data, runs in the threadpool instead of
+        blocking the event loop.
+        """
+        if self._loaded_version is None:
+            await run_in_threadpool(self.ensure_fresh)
+        else:
+            self.ensure_fresh()
+
+    def search_skills(self, query: str, limit: int) -> list[str]:
+        self.ensure_fresh()
+        return self.skills.search(query, limit)
+
+    def search_locations(self, query: str, limit: int) -> list[dict]:
+        self.ensure_fresh()
+        return self.locations.search(query, limit)
+
+    def search_industries(self, query: str, limit: int) -> list[dict]:
+        self.ensure_fresh()
+        return self.industries.search(query, limit)
+
+    def skill(self, name: str) -> Optional[SkillCoefficients]:
+        return self._lookup(self.skill_coefficients, name)
+
+    def location_multiplier(self, city: str) -> Optional[float]:
+        return self._lookup(self.location_multipliers, city)
+
+    def industry_trend(self, industry: str) -> Optional[float]:
+        return self._lookup(self.industry_trends, industry)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1)
+            if self._loaded_version is not None else None,
+            "skills": len(self.skill_coefficients),
+            "locations": len(self.location_multipliers),
+            "industries": len(self.industry_trends),
+        }
+
+    def _lookup(self, table: dict, key: str) -> Any:
+        """
+        `key` in one of the coefficient tables, `None` when missing.
+        """
+        hit = key in table
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return table.get(key)
+
+    def _reload_in_background(self) -> None:
+        if self._engine is None:
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        threading.Thread(target=self._background_reload, daemon=True).start()
+
+    def _background_reload(self) -> None:
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Unable to reload reference data")
+        finally:
+            self._reloading = False
+
+
+reference_data = ReferenceData()
+
+
+@event.listens_for(SASession, "after_flush")
+def _track_reference_changes(session, flush_context) -> None:
+    changed = chain(session.new, session.dirty, session.deleted)
+    if any(isinstance(instance, REFERENCE_MODELS) for instance in changed):
+        session.info["reference_data_changed"] = True
+
+
+@event.listens_for(SASession, "after_commit")
+def _invalidate_reference_data(session) -> None:
+    if session.info.pop("reference_data_changed", False):
+        reference_data.invalidate()
@@ -0,0 +1,27 @@
+import logging
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def init() -> None:
+    with Session(engine) as session:
+        segments = crud.refresh_market_rollups(session)
+        logger.info(f"Refreshed {segments} market insights segments")
+        segments = crud.rebuild_salary_statistics(session)
+        logger.info(f"Refreshed {segments} salary statistics segments")
+
+
+def main() -> None:
+    logger.info("Refreshing market insights rollups and salary statistics")
+    init()
+    logger.info("Market insights rollups and salary statistics refreshed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Resume skill indexing: the text of uploaded PDF and DOCX resumes is
+extracted and matched against the skills reference table, and the skills
+found are stored per candidate (`CandidateResumeSkill`).
+
+Extraction and matching run in a pool of worker processes, started from a
+background task once the upload's response has been sent.
+"""
+import asyncio
+import io
+import logging
+import re
+import uuid
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from xml.etree import ElementTree
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.storage import storage
+from app.models import Candidate
+from app.reference_data import reference_data
+
+logger = logging.getLogger(__name__)
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _pdf_text(data: bytes) -> str:
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _docx_text(data: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(data)) as docx:
+        document = ElementTree.fromstring(docx.read("word/document.xml"))
+    return "\n".join(
+        "".join(text.text or "" for text in paragraph.iter(f"{_WORD_NAMESPACE}t"))
+        for paragraph in document.iter(f"{_WORD_NAMESPACE}p")
+    )
+
+
+def extract_resume_text(data: bytes, extension: str) -> str:
+    if extension == "pdf":
+        return _pdf_text(data)
+    if extension == "docx":
+        return _docx_text(data)
+    return ""
+
+
+@lru_cache(maxsize=4)
+def _skills_pattern(skill_names: tuple[str, ...]) -> re.Pattern:
+    """
+    Pattern matching any of the skills as whole words, longest first so
+    that "Java" doesn't shadow "JavaScript". Skill names may contain
+    symbols ("C++", "C#", "Node.js") that aren't word characters.
+    """
+    names = sorted({name.lower() for name in skill_names}, key=len, reverse=True)
+    alternatives = "|".join(
+        r"\s+".join(re.escape(word) for word in name.split()) for name in names
+    )
+    return re.compile(rf"(?<![\w+#.])(?:{alternatives})(?![\w+#])")
+
+
+def count_skills(text: str, skill_names: tuple[str, ...]) -> dict[str, int]:
+    """
+    Occurrences of each of `skill_names` in `text`, by skill name.
+    """
+    if not skill_names:
+        return {}
+    names = {" ".join(name.lower().split()): name for name in skill_names}
+    counts = Counter(
+        names[" ".join(match.split())]
+        for match in _skills_pattern(skill_names).findall(text.lower())
+    )
+    return dict(counts)
+
+
+def extract_resume_skills(
+    data: bytes, extension: str, skill_names: tuple[str, ...]
+) -> dict[str, int]:
+    """
+    Skills found in a resume. CPU bound, runs in the worker processes.
+    """
+    return count_skills(extract_resume_text(data, extension), skill_names)
+
+
+def _resume_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.RESUME_WORKERS)
+    return _executor
+
+
+def _save_resume_skills(
+    candidate_id: uuid.UUID, resume: str, skills: dict[str, int]
+) -> None:
+    with Session(engine) as session:
+        candidate = session.get(Candidate, candidate_id)
+        # Skipped when another resume was uploaded meanwhile
+        if candidate and candidate.resume_upload == resume:
+            crud.replace_candidate_resume_skills(
+                session=session, candidate_id=candidate_id, skills=skills
+            )
+
+
+async def process_resume(candidate_id: uuid.UUID, key: str) -> None:
+    """
+    Background task indexing the skills of a candidate's new resume.
+    """
+    extension = key.rsplit(".", 1)[-1]
+    try:
+        await run_in_threadpool(reference_data.ensure_fresh)
+        skill_names = tuple(reference_data.skill_coefficients)
+        data = await run_in_threadpool(storage.read, key)
+        skills = await asyncio.get_running_loop().run_in_executor(
+            _resume_executor(), extract_resume_skills, data, extension,
+            skill_names
+        )
+    except Exception:
+        logger.exception("Unable to extract the skills of resume %s", key)
+        return
+    await run_in_threadpool(
+        _save_resume_skills, candidate_id, storage.url(key), skills
+    )
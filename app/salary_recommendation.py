@@ -1,4 +1,8 @@
 import logging
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
 
 logging.basicConfig(
   level=logging.INFO,
@@ -51,6 +55,131 @@ def calculate_flexibility_premium(flexibility_score, flexibility_multiplier):
   '''Calculates the flexibility premium.'''
   return flexibility_score * flexibility_multiplier
 
+@dataclass(frozen=True)
+class SalaryConstants:
+  '''Coefficients that don't depend on the candidate or the market yet.'''
+  # Todo: Make all these values dynamic
+  internal_weight: float = 0.4
+  external_salary: float = 52000 # External market salary
+  external_weight: float = 0.5
+  customization_factor: float = 5000
+  customization_weight: float = 0.1
+  risk_percentage: float = 5
+  benefits: float = 10000 # Value of benefits/equity
+  transparency_score: float = 4 # (1–5)
+  transparency_weight: float = 0.02
+  equity_score: float = 4 # Diversity and equity score (1–5)
+  diversity_premium: float = 2000
+  flexibility_score: float = 3 # (1–5)
+  flexibility_multiplier: float = 1500
+  well_being_value: float = 3000 # Well-being benefits value
+  functional_multiplier: float = 1.05 # Industry adjustment
+  market_demand_multiplier: float = 1.03 # Market demand adjustment
+
+@dataclass(frozen=True)
+class MarketContext:
+  '''Candidate independent inputs, shared by every candidate recommended
+  for the same job, location and industry.'''
+  internal_median: float
+  location_multiplier: float
+  trend_percentage: float
+  constants: SalaryConstants = SalaryConstants()
+
+@dataclass(frozen=True)
+class SkillInput:
+  proficiency: float
+  weight: float
+  market_premium: float
+
+@dataclass(frozen=True)
+class SalaryRecommendation:
+  components: dict[str, float]
+  subtotal: float
+  final_salary: float
+
+SALARY_COMPONENTS = (
+  'internal_component', 'external_component', 'skill_premium',
+  'location_adjustment', 'trend_adjustment', 'customization_adjustment',
+  'risk_premium', 'benefits', 'transparency_adjustment', 'equity_adjustment',
+  'flexibility_premium', 'well_being_value'
+)
+
+@lru_cache(maxsize=1024)
+def calculate_market_components(context):
+  '''Calculates every component but the skill premium, once per context.'''
+  I, constants = context.internal_median, context.constants
+  return {
+    'internal_component': calculate_internal_component(I,
+    constants.internal_weight),
+    'external_component': calculate_external_component(
+    constants.external_salary, constants.external_weight),
+    'location_adjustment': calculate_location_adjustment(I,
+    context.location_multiplier),
+    'trend_adjustment': calculate_trend_adjustment(I,
+    context.trend_percentage),
+    'customization_adjustment': calculate_customization_adjustment(
+    constants.customization_factor, constants.customization_weight),
+    'risk_premium': calculate_risk_premium(I, constants.risk_percentage),
+    'benefits': constants.benefits,
+    'transparency_adjustment': calculate_transparency_adjustment(I,
+    constants.transparency_score, constants.transparency_weight),
+    'equity_adjustment': calculate_equity_adjustment(constants.equity_score,
+    constants.diversity_premium),
+    'flexibility_premium': calculate_flexibility_premium(
+    constants.flexibility_score, constants.flexibility_multiplier),
+    'well_being_value': constants.well_being_value,
+  }
+
+def build_recommendation(context, skill_premium):
+  '''Adds the skill premium to the market components of the context.'''
+  components = dict(calculate_market_components(context))
+  components['skill_premium'] = skill_premium
+  components = {name: components[name] for name in SALARY_COMPONENTS}
+
+  # Calculate subtotal and apply functional and market demand multipliers
+  subtotal = sum(components.values())
+  final_salary = subtotal * context.constants.functional_multiplier * \
+    context.constants.market_demand_multiplier
+  return SalaryRecommendation(components, subtotal, final_salary)
+
+def recommend_salary(context, skills):
+  '''Calculates the recommended salary of one candidate.'''
+  skill_premium = calculate_skill_premium(
+    [skill.proficiency for skill in skills],
+    [skill.weight for skill in skills],
+    [skill.market_premium for skill in skills]
+  )
+  return build_recommendation(context, skill_premium)
+
+def recommend_salaries(contexts, skills):
+  '''Calculates the recommended salaries of many candidates, the skill
+  premiums in one vectorized pass over the skills of all the candidates.'''
+  skill_counts = np.fromiter(
+    (len(candidate_skills) for candidate_skills in skills), dtype=np.intp,
+    count=len(skills)
+  )
+  # (proficiency, weight, market premium) rows of every skill, candidate
+  # after candidate, read in one go
+  values = np.fromiter(
+    (
+      value
+      for candidate_skills in skills
+      for skill in candidate_skills
+      for value in (skill.proficiency, skill.weight, skill.market_premium)
+    ),
+    dtype=float, count=3 * int(skill_counts.sum())
+  ).reshape(-1, 3)
+  # Sum the products of each candidate's rows
+  candidates = np.repeat(np.arange(len(skills)), skill_counts)
+  skill_premiums = np.bincount(
+    candidates, weights=values.prod(axis=1), minlength=len(skills)
+  )
+
+  return [
+    build_recommendation(context, float(skill_premium))
+    for context, skill_premium in zip(contexts, skill_premiums)
+  ]
+
 def calculate_final_salary(
   I, Wi, E, We, skills, skill_weights, market_premiums,
   location_multiplier, trend_percentage, C, Wc, risk_percentage,
@@ -67,40 +196,21 @@ def calculate_final_salary(
     return None
 
   try:
-    internal_component = calculate_internal_component(I, Wi)
-    external_component = calculate_external_component(E, We)
-    skill_premium = calculate_skill_premium(skills, skill_weights,
-    market_premiums)
-    location_adjustment = calculate_location_adjustment(I, location_multiplier)
-    trend_adjustment = calculate_trend_adjustment(I, trend_percentage)
-    customization_adjustment = calculate_customization_adjustment(C, Wc)
-    risk_premium = calculate_risk_premium(I, risk_percentage)
-    transparency_adjustment = calculate_transparency_adjustment(I,
-    transparency_score, transparency_weight)
-    equity_adjustment = calculate_equity_adjustment(equity_score,
-    diversity_premium)
-    flexibility_premium = calculate_flexibility_premium(flexibility_score,
-    flexibility_multiplier)
-
-    # Calculate subtotal
-    subtotal = (
-      internal_component +
-      external_component +
-      skill_premium +
-      location_adjustment +
-      trend_adjustment +
-      customization_adjustment +
-      risk_premium +
-      benefits +
-      transparency_adjustment +
-      equity_adjustment +
-      flexibility_premium +
-      well_being_value
+    context = MarketContext(
+      internal_median=I,
+      location_multiplier=location_multiplier,
+      trend_percentage=trend_percentage,
+      constants=SalaryConstants(
+        Wi, E, We, C, Wc, risk_percentage, benefits, transparency_score,
+        transparency_weight, equity_score, diversity_premium,
+        flexibility_score, flexibility_multiplier, well_being_value,
+        functional_multiplier, market_demand_multiplier
+      )
     )
-
-    # Apply functional and market demand multipliers
-    final_salary = subtotal * functional_multiplier * market_demand_multiplier
-    return final_salary
+    return recommend_salary(context, [
+      SkillInput(*skill)
+      for skill in zip(skills, skill_weights, market_premiums)
+    ]).final_salary
   except Exception as e:
     logging.error(f'Error in salary calculation: {e}')
     return None
@@ -0,0 +1,114 @@
+"""
+Ranked prefix text search over the text columns of a table.
+
+On Postgres the columns are matched as a `to_tsvector` document, served by
+the GIN expression index built from `search_document_sql`, and ranked with
+`ts_rank`. Plain substring filters on the same columns are served by
+pg_trgm indexes. Other databases (SQLite in offline tests) fall back to an
+ILIKE per search term and a score summing the weights of the matched
+columns.
+
+Column weights are the tsvector weight labels of the document on Postgres,
+so both rank the columns alike.
+"""
+import re
+from typing import Optional, Sequence
+
+from sqlalchemy import and_, case, func, literal_column, or_
+
+SEARCH_CONFIG = "simple"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(query: str) -> list[str]:
+    return [term.lower() for term in _TERM.findall(query or "")]
+
+
+def prefix_tsquery(query: str) -> str:
+    """
+    `to_tsquery` input matching every term of the query as a prefix.
+    """
+    return " & ".join(f"{term}:*" for term in search_terms(query))
+
+
+# tsvector weight labels, highest first
+_WEIGHT_LABELS = "ABCD"
+
+
+def _weight_labels(weights: Sequence[float]) -> list[str]:
+    """
+    Label of each weight, the same for equal weights. At most 4 distinct
+    weights.
+    """
+    distinct = sorted(set(weights), reverse=True)
+    return [_WEIGHT_LABELS[distinct.index(weight)] for weight in weights]
+
+
+def _ts_rank_weights(weights: Sequence[float]) -> str:
+    """
+    `ts_rank` weights array ({D, C, B, A}) giving each label its weight
+    relative to the highest one.
+    """
+    distinct = sorted(set(weights), reverse=True)
+    values = [weight / distinct[0] for weight in distinct]
+    values += [0.0] * (len(_WEIGHT_LABELS) - len(values))
+    return "'{%s}'::float4[]" % ", ".join(str(value) for value in reversed(values))
+
+
+def search_document_sql(
+    columns: Sequence[str], table: Optional[str] = None,
+    weights: Optional[Sequence[float]] = None
+) -> str:
+    """
+    SQL of the tsvector document for `columns`, each labeled after its
+    weight. Queries must use exactly this expression (same columns and
+    weights) for Postgres to pick the GIN index built on it.
+    """
+    prefix = f"{table}." if table else ""
+    labels = _weight_labels(weights or [1] * len(columns))
+    document = " || ".join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, "
+        f"coalesce({prefix}{column}, '')), '{label}')"
+        for column, label in zip(columns, labels)
+    )
+    # Parenthesized, index expressions other than a function call must be
+    return f"({document})"
+
+
+def text_search(
+    dialect_name: str, columns: Sequence, query: str,
+    weights: Optional[Sequence[float]] = None
+):
+    """
+    Condition and rank expression matching `query` against `columns`, or
+    (None, None) when the query has no searchable terms.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None, None
+
+    weights = weights or [1] * len(columns)
+    if dialect_name == "postgresql":
+        table = columns[0].table.name
+        document = literal_column(search_document_sql(
+            [column.name for column in columns], table, weights
+        ))
+        tsquery = func.to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), prefix_tsquery(query)
+        )
+        rank = func.ts_rank(
+            literal_column(_ts_rank_weights(weights)), document, tsquery
+        )
+        return document.op("@@")(tsquery), rank
+
+    condition = and_(*(
+        or_(*(column.ilike(f"%{term}%") for column in columns))
+        for term in terms
+    ))
+    rank = sum(
+        case((column.ilike(f"%{term}%"), weight), else_=0)
+        for term in terms
+        for column, weight in zip(columns, weights)
+    )
+    return condition, rank
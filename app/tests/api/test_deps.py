@@ -0,0 +1,76 @@
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api import deps
+from app.core.security import create_access_token
+from app.models import Candidate, Client
+
+
+def test_current_user_is_cached_until_updated(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'deps.db'}")
+    SQLModel.metadata.create_all(engine, tables=[Candidate.__table__])
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    with Session(engine) as session:
+        candidate = Candidate(email="cached@example.com", full_name="Ann")
+        session.add(candidate)
+        session.commit()
+        candidate_id = candidate.id
+    token = create_access_token(
+        candidate_id, timedelta(minutes=5), user_type="candidate"
+    )
+    deps.principal_cache.clear()
+
+    with Session(engine) as session:
+        assert deps.get_current_user(session, token).full_name == "Ann"
+    statements.clear()
+    with Session(engine) as session:
+        user = deps.get_current_user(session, token)
+        assert user.id == candidate_id
+        assert statements == []
+
+        user.full_name = "Anna"
+        session.add(user)
+        session.commit()
+
+    with Session(engine) as session:
+        assert deps.get_current_user(session, token).full_name == "Anna"
+
+
+def test_async_current_user_is_cached(tmp_path) -> None:
+    path = tmp_path / "deps.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine, tables=[Client.__table__])
+    with Session(engine) as session:
+        client = Client(email="acme@example.com", company_name="Acme")
+        session.add(client)
+        session.commit()
+        client_id = client.id
+    token = create_access_token(
+        client_id, timedelta(minutes=5), user_type="client"
+    )
+    deps.principal_cache.clear()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    statements = []
+    event.listen(
+        async_engine.sync_engine, "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+
+    async def current_user() -> Client:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            return await deps.get_current_user_async(session, token)
+
+    assert asyncio.run(current_user()).company_name == "Acme"
+    assert statements
+    statements.clear()
+    assert asyncio.run(current_user()).id == client_id
+    assert statements == []
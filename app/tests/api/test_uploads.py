@@ -0,0 +1,66 @@
+import hashlib
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import uploads
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = FastAPI()
+    app.include_router(uploads.router)
+    with patch("app.api.routes.uploads.settings.UPLOADS_DIR", str(tmp_path)):
+        yield TestClient(app)
+
+
+def test_content_addressed_upload_is_immutable(client, tmp_path) -> None:
+    content = b"%PDF-1.4 " + bytes(range(256)) * 40
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = tmp_path / "resumes" / sha256[:2] / f"{sha256}.pdf"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(content)
+    url = f"/uploads/resumes/{sha256[:2]}/{sha256}.pdf"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["etag"] == f'"{sha256}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["content-type"] == "application/pdf"
+
+    response = client.get(url, headers={"If-None-Match": f'W/"{sha256}"'})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(url, headers={"Range": "bytes=0-8"})
+    assert response.status_code == 206
+    assert response.content == content[:9]
+    assert response.headers["content-range"] == f"bytes 0-8/{len(content)}"
+
+
+def test_legacy_upload_is_revalidated(client, tmp_path) -> None:
+    (tmp_path / "avatar").mkdir()
+    (tmp_path / "avatar" / "me.png").write_bytes(b"png")
+
+    response = client.get("/uploads/avatar/me.png")
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{hashlib.sha256(b"png").hexdigest()}"'
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get(
+        "/uploads/avatar/me.png",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_upload_outside_root_or_staging_not_found(client, tmp_path) -> None:
+    (tmp_path / ".staging").mkdir()
+    (tmp_path / ".staging" / "partial").write_bytes(b"x")
+
+    assert client.get("/uploads/.staging/partial").status_code == 404
+    assert client.get("/uploads/..%2Fsecret").status_code == 404
+    assert client.get("/uploads/missing.pdf").status_code == 404
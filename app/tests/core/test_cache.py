@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from app.core.cache import TTLCache
+
+
+def test_ttl_cache_get_set() -> None:
+    cache = TTLCache(ttl=60)
+    assert cache.get("key") is None
+    cache.set("key", 1)
+    assert cache.get("key") == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_ttl_cache_expires() -> None:
+    cache = TTLCache(ttl=60)
+    with patch("app.core.cache.time.monotonic", return_value=0):
+        cache.set("key", 1)
+    with patch("app.core.cache.time.monotonic", return_value=61):
+        assert cache.get("key") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_evicts_oldest() -> None:
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_invalidate() -> None:
+    cache = TTLCache(ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert cache.get("b") is None
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import exc as sa_exc
+
+from app.core.pool import InstrumentedQueuePool, pool_stats
+
+
+def test_pool_stats_track_checkouts_and_timeouts(tmp_path) -> None:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    connection = engine.connect()
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 1
+    assert stats["saturation"] == 1
+    assert stats["checkouts"] == 1
+
+    with pytest.raises(sa_exc.TimeoutError):
+        engine.connect()
+    connection.close()
+
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["saturation"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.01
@@ -0,0 +1,102 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core.rate_limit import (
+    InMemoryRateLimitBackend,
+    RateLimit,
+    RateLimiter,
+    RedisRateLimitBackend,
+    client_ip,
+)
+
+
+def test_token_bucket_refills() -> None:
+    backend = InMemoryRateLimitBackend()
+    limit = RateLimit(burst=2, per_minute=6)
+
+    def take(key: str) -> float:
+        return asyncio.run(backend.take(key, limit))
+
+    with patch("app.core.rate_limit.time.monotonic", return_value=0):
+        assert take("key") == 0
+        assert take("key") == 0
+        assert take("key") == pytest.approx(10)
+        assert take("other") == 0
+    with patch("app.core.rate_limit.time.monotonic", return_value=10):
+        assert take("key") == 0
+        assert take("key") == pytest.approx(10)
+
+
+def test_redis_token_bucket_script() -> None:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    limit = RateLimit(burst=2, per_minute=6)
+
+    async def scenario() -> None:
+        client = fakeredis.FakeAsyncRedis()
+        backend = RedisRateLimitBackend(client)
+        assert await backend.take("key", limit) == 0
+        assert await backend.take("key", limit) == 0
+        assert await backend.take("key", limit) == pytest.approx(10, abs=0.5)
+        assert await backend.take("other", limit) == 0
+        # Expires once it would be full again
+        assert await client.ttl("key") == 21
+
+        # A bucket refilled for 5 seconds has half a token
+        await client.hset("key", mapping={
+            "tokens": 0, "updated_at": float((await client.time())[0]) - 5,
+        })
+        assert await backend.take("key", limit) == pytest.approx(5, abs=1.5)
+
+    asyncio.run(scenario())
+
+
+def test_rate_limiter_raises_429_with_retry_after() -> None:
+    limiter = RateLimiter(InMemoryRateLimitBackend())
+    ip_limit = RateLimit(burst=5, per_minute=1)
+    email_limit = RateLimit(burst=1, per_minute=1)
+
+    def check(email: str) -> None:
+        asyncio.run(limiter.check(
+            ("ip", "1.2.3.4", ip_limit), ("email", email, email_limit)
+        ))
+
+    check("a@b.com")
+    with pytest.raises(HTTPException) as exc_info:
+        check("a@b.com")
+    assert exc_info.value.status_code == 429
+    assert 0 < int(exc_info.value.headers["Retry-After"]) <= 60
+
+    # Another email from the same IP still gets through
+    check("c@d.com")
+
+
+def _request(host: str, *forwarded_for: str) -> Request:
+    return Request({
+        "type": "http",
+        "client": (host, 1234),
+        "headers": [
+            (b"x-forwarded-for", header.encode()) for header in forwarded_for
+        ],
+    })
+
+
+def test_client_ip_behind_trusted_proxies() -> None:
+    with patch(
+        "app.core.rate_limit.settings.TRUSTED_PROXIES", ["10.0.0.0/8", "::1"]
+    ):
+        # Forwarded by Nginx, the first address is forged by the client
+        assert client_ip(_request("10.0.0.2", "1.1.1.1, 2.2.2.2")) == "2.2.2.2"
+        assert client_ip(
+            _request("10.0.0.2", "1.1.1.1", "2.2.2.2, 10.0.0.3")
+        ) == "2.2.2.2"
+        assert client_ip(_request("::1", "3.3.3.3")) == "3.3.3.3"
+        assert client_ip(_request("10.0.0.2")) == "10.0.0.2"
+        # Headers sent by untrusted clients are ignored
+        assert client_ip(_request("4.4.4.4", "1.1.1.1")) == "4.4.4.4"
+
+    assert client_ip(_request("10.0.0.2", "1.1.1.1")) == "10.0.0.2"
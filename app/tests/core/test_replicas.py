@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.replicas import ReplicaSet, RoutingSession
+from app.models import Skills
+
+
+def _engines(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, name in ((primary, "Primary"), (replica, "Replica")):
+        SQLModel.metadata.create_all(engine, tables=[Skills.__table__])
+        with Session(engine) as session:
+            session.add(Skills(name=name, weight=1, market_premium=0))
+            session.commit()
+    return primary, replica
+
+
+def _skill_names(session: Session) -> list[str]:
+    return sorted(session.exec(select(Skills.name)).all())
+
+
+def test_reads_go_to_replica_and_writes_to_primary(tmp_path) -> None:
+    primary, replica = _engines(tmp_path)
+    replicas = ReplicaSet([replica])
+
+    with RoutingSession(primary=primary, replicas=replicas) as session:
+        assert _skill_names(session) == ["Replica"]
+
+        session.add(Skills(name="Rust", weight=1, market_premium=0))
+        session.commit()
+        # Reads its own writes from then on
+        assert _skill_names(session) == ["Primary", "Rust"]
+
+    with RoutingSession(primary=primary, replicas=replicas) as session:
+        assert _skill_names(session) == ["Replica"]
+
+
+def test_lagging_replica_falls_back_to_primary(tmp_path) -> None:
+    primary, replica = _engines(tmp_path)
+    replicas = ReplicaSet([replica])
+
+    with patch.object(ReplicaSet, "_measure_lag", return_value=60.0):
+        with RoutingSession(primary=primary, replicas=replicas) as session:
+            assert _skill_names(session) == ["Primary"]
+
+    with RoutingSession(primary=primary, replicas=ReplicaSet()) as session:
+        assert _skill_names(session) == ["Primary"]
+
+
+def test_flush_switches_to_primary(tmp_path) -> None:
+    primary, replica = _engines(tmp_path)
+
+    with RoutingSession(primary=primary, replicas=ReplicaSet([replica])) as session:
+        assert _skill_names(session) == ["Replica"]
+        session.add(Skills(name="Go", weight=1, market_premium=0))
+        session.flush()
+        # The uncommitted row is only visible on the primary's connection
+        assert _skill_names(session) == ["Go", "Primary"]
+        assert session.info["use_primary"]
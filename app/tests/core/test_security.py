@@ -0,0 +1,33 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+
+
+def test_verify_and_update_password_rehashes_other_cost() -> None:
+    old_hash = security.pwd_context.hash("secret", rounds=4)
+
+    verified, new_hash = security.verify_and_update_password("secret", old_hash)
+    assert verified
+    assert new_hash is not None
+    assert security.verify_and_update_password("secret", new_hash) == (True, None)
+    assert security.verify_and_update_password("wrong", old_hash) == (False, None)
+
+
+def test_password_hash_async() -> None:
+    hashed = asyncio.run(security.get_password_hash_async("secret"))
+    assert asyncio.run(
+        security.verify_and_update_password_async("secret", hashed)
+    ) == (True, None)
+
+
+def test_password_work_rejected_when_pool_is_full() -> None:
+    with patch.object(security, "_password_slots", threading.BoundedSemaphore(1)):
+        security._password_slots.acquire()
+        with pytest.raises(HTTPException) as exc_info:
+            security.get_password_hash("secret")
+    assert exc_info.value.status_code == 503
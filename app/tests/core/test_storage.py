@@ -0,0 +1,44 @@
+from app.core.storage import S3Storage
+
+
+class FakeS3Client:
+    """
+    Local stand-in for the boto3 S3 client methods used by S3Storage.
+    """
+
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], dict] = {}
+        self.uploads = 0
+
+    def list_objects_v2(self, Bucket: str, Prefix: str, MaxKeys: int) -> dict:
+        keys = sorted(
+            key for bucket, key in self.objects
+            if bucket == Bucket and key.startswith(Prefix)
+        )[:MaxKeys]
+        return {"Contents": [{"Key": key} for key in keys]} if keys else {}
+
+    def upload_file(self, path: str, bucket: str, key: str, ExtraArgs: dict) -> None:
+        self.uploads += 1
+        with open(path, "rb") as f:
+            self.objects[bucket, key] = {"Body": f.read(), **ExtraArgs}
+
+
+def test_s3_storage_deduplicates(tmp_path) -> None:
+    client = FakeS3Client()
+    storage = S3Storage(client, "uploads", "https://cdn.example.com/")
+    path = tmp_path / "upload"
+    path.write_bytes(b"%PDF")
+
+    assert not storage.exists("resumes/ab/abc.pdf")
+    assert storage.put("resumes/ab/abc.pdf", str(path))
+    assert not storage.put("resumes/ab/abc.pdf", str(path))
+    assert storage.exists("resumes/ab/abc.pdf")
+
+    assert client.uploads == 1
+    stored = client.objects["uploads", "resumes/ab/abc.pdf"]
+    assert stored["Body"] == b"%PDF"
+    assert stored["ContentType"] == "application/pdf"
+    assert "immutable" in stored["CacheControl"]
+    assert storage.url("resumes/ab/abc.pdf") == (
+        "https://cdn.example.com/resumes/ab/abc.pdf"
+    )
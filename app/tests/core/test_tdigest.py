@@ -0,0 +1,31 @@
+import random
+
+import pytest
+
+from app.core.tdigest import TDigest
+
+
+def test_tdigest_small_samples_are_exact() -> None:
+    digest = TDigest()
+    digest.update([100000, 50000, 70000, 60000])
+    assert digest.quantile(0.1) == pytest.approx(53000)
+    assert digest.quantile(0.5) == pytest.approx(65000)
+    assert digest.quantile(0.9) == pytest.approx(91000)
+    assert TDigest().quantile(0.5) is None
+
+
+def test_tdigest_merge_serialized_digests() -> None:
+    rng = random.Random(7)
+    values = [rng.lognormvariate(11, 0.5) for _ in range(50000)]
+    merged = TDigest()
+    for start in range(10):
+        digest = TDigest()
+        digest.update(values[start::10])
+        merged.merge(TDigest.from_dict(digest.to_dict()))
+
+    values.sort()
+    assert merged.count == len(values)
+    assert len(merged.to_dict()["centroids"]) < 200
+    for fraction in (0.1, 0.5, 0.9):
+        exact = values[int(fraction * (len(values) - 1))]
+        assert merged.quantile(fraction) == pytest.approx(exact, rel=0.01)
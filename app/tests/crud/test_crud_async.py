@@ -0,0 +1,91 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud, crud_async
+from app.api.schemas.candidates import CandidateCreate, CandidateUpdate
+from app.api.schemas.jobs import JobCreate
+from app.models import Client
+
+
+def _engines(tmp_path):
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    return engine, create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+
+def test_candidate_functions(tmp_path) -> None:
+    _, async_engine = _engines(tmp_path)
+
+    async def scenario() -> None:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            candidate = await crud_async.create_candidate(
+                session=session, candidate_in=CandidateCreate(
+                    email="ann@example.com", full_name="Ann",
+                    phone_number="5550100", password="correct horse",
+                )
+            )
+            assert candidate.hashed_password != "correct horse"
+
+            found = await crud_async.get_candidate_by_email(
+                session=session, email="ann@example.com"
+            )
+            assert found.id == candidate.id
+            found = await crud_async.get_candidate_by_phone_number(
+                session=session, phone_number="5550100"
+            )
+            assert found.id == candidate.id
+
+            assert await crud_async.authenticate_candidate(
+                session=session, email="ann@example.com", password="wrong"
+            ) is None
+            authenticated = await crud_async.authenticate_candidate(
+                session=session, email="ann@example.com",
+                password="correct horse",
+            )
+            assert authenticated.id == candidate.id
+
+            updated = await crud_async.update_candidate(
+                session=session, db_candidate=candidate,
+                candidate_in=CandidateUpdate(
+                    email="ann@example.com", full_name="Anna"
+                ),
+            )
+            assert updated.full_name == "Anna"
+
+    asyncio.run(scenario())
+
+
+def test_sync_implementations_run_on_the_async_session(tmp_path) -> None:
+    engine, async_engine = _engines(tmp_path)
+    with Session(engine) as session:
+        client = Client(email="acme@example.com", company_name="Acme")
+        session.add(client)
+        session.commit()
+        for title in ("Backend developer", "Frontend developer"):
+            crud.create_job(session=session, job_in=JobCreate(
+                title=title, description="Remote", location="Austin",
+                salary_min=50000, salary_max=70000, client_id=client.id,
+            ))
+        client_id = client.id
+
+    async def scenario() -> None:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            page = await crud_async.get_jobs_by_client(
+                session=session, client_id=client_id, skip=0, limit=10
+            )
+            assert page.count == 2
+            job = await crud_async.get_job_by_id(
+                session=session, job_id=page.data[0].id
+            )
+            assert job.client.company_name == "Acme"
+
+            public = await crud_async.build_jobs_public(
+                session=session, jobs=page.data
+            )
+            assert {job.client_details.company_name for job in public} == {"Acme"}
+
+    asyncio.run(scenario())
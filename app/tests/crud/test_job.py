@@ -0,0 +1,282 @@
+from collections.abc import Generator
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app import crud
+from app.api.schemas.candidates import CandidateCreate
+from app.api.schemas.clients import ClientCreate
+from app.api.schemas.jobs import (
+    CountModeEnum, JobCreate, JobInsightsRequest, JobSearch, JobUpdate
+)
+from app.models import Client
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+@pytest.fixture
+def db(tmp_path) -> Generator[Session, None, None]:
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def create_random_client(db: Session) -> Client:
+    client_in = ClientCreate(
+        email=random_email(),
+        password=random_lower_string(),
+        company_name=random_lower_string(),
+    )
+    return crud.create_client(session=db, client_in=client_in)
+
+
+def test_get_market_insights(db: Session) -> None:
+    client = create_random_client(db)
+    title = random_lower_string()
+    for salary_min, salary_max in [(10000, 20000), (30000, 40000), (120000, 150000)]:
+        job_in = JobCreate(
+            title=title,
+            description=random_lower_string(),
+            salary_min=salary_min,
+            salary_max=salary_max,
+            client_id=client.id,
+        )
+        crud.create_job(session=db, job_in=job_in)
+
+    insights = crud.get_market_insights(
+        session=db, filters=JobInsightsRequest(title=title)
+    )
+    assert insights.total_jobs == 3
+    assert insights.average_salary == 61666.666666666664
+    assert insights.top_companies[0].company_name == client.company_name
+    assert insights.top_companies[0].job_count == 3
+    # Computed by the database on Postgres only when the rollups can't answer
+    if db.get_bind().dialect.name == "postgresql":
+        assert insights.salary_percentiles.median == 35000
+    else:
+        assert insights.salary_percentiles is None
+    assert insights.job_type_distribution[0].count == 3
+    assert [bucket.count for bucket in insights.salary_distribution] == [1, 1, 0, 0, 1]
+
+
+def test_get_market_insights_no_jobs(db: Session) -> None:
+    insights = crud.get_market_insights(
+        session=db, filters=JobInsightsRequest(title=random_lower_string())
+    )
+    assert insights.total_jobs == 0
+    assert insights.average_salary is None
+    assert insights.salary_distribution == []
+
+
+def test_market_rollups_follow_job_changes(db: Session) -> None:
+    client = create_random_client(db)
+    location = random_lower_string()
+    job_in = JobCreate(
+        title=random_lower_string(),
+        description=random_lower_string(),
+        location=location,
+        salary_min=30000,
+        salary_max=40000,
+        client_id=client.id,
+    )
+    job = crud.create_job(session=db, job_in=job_in)
+
+    filters = JobInsightsRequest(location=location)
+    insights = crud.get_market_insights(session=db, filters=filters)
+    assert insights.total_jobs == 1
+    assert insights.salary_distribution[1].count == 1
+    assert insights.salary_percentiles.median == 35000
+
+    job_update = JobUpdate(
+        title=job.title,
+        description=job.description,
+        location=location,
+        salary_min=80000,
+        salary_max=90000,
+    )
+    crud.update_job(session=db, db_client=job, job_in=job_update)
+    insights = crud.get_market_insights(session=db, filters=filters)
+    assert insights.total_jobs == 1
+    assert insights.salary_distribution[1].count == 0
+    assert insights.salary_distribution[3].count == 1
+    assert insights.salary_percentiles.median == 85000
+
+    crud.delete_job(session=db, db_job=job)
+    insights = crud.get_market_insights(session=db, filters=filters)
+    assert insights.total_jobs == 0
+    assert insights.salary_percentiles is None
+
+
+def test_salary_statistics_follow_job_changes(db: Session) -> None:
+    client = create_random_client(db)
+    title = random_lower_string()
+    jobs = [
+        crud.create_job(session=db, job_in=JobCreate(
+            title=title,
+            description=random_lower_string(),
+            location="Austin",
+            salary_min=salary_min,
+            salary_max=salary_min + 20000,
+            client_id=client.id,
+        ))
+        for salary_min in (40000, 50000, 60000, 90000)
+    ]
+
+    statistics = crud.get_salary_statistics(db, jobs[0])
+    assert statistics.sample_size == 4
+    assert statistics.mean == 70000
+    assert statistics.median == 65000
+    assert statistics.p10 == 53000
+    assert statistics.p90 == 91000
+
+    job_update = JobUpdate(
+        title=random_lower_string(),
+        description=jobs[3].description,
+        location="Austin",
+        salary_min=10000,
+        salary_max=20000,
+    )
+    crud.update_job(session=db, db_client=jobs[3], job_in=job_update)
+    statistics = crud.get_salary_statistics(db, jobs[0])
+    assert statistics.sample_size == 3
+    assert statistics.median == 60000
+
+    moved = crud.get_salary_statistics(db, jobs[3])
+    assert moved.sample_size == 1
+    crud.delete_job(session=db, db_job=jobs[3])
+    assert crud.get_salary_statistics(db, jobs[0]).sample_size == 3
+
+
+def test_internal_median_salaries_of_many_segments(db: Session) -> None:
+    client = create_random_client(db)
+    backend, frontend = random_lower_string(), random_lower_string()
+    jobs = [
+        crud.create_job(session=db, job_in=JobCreate(
+            title=title,
+            description=random_lower_string(),
+            location="Austin",
+            salary_min=salary_min,
+            salary_max=salary_min + 20000,
+            client_id=client.id,
+        ))
+        for title, salary_min in (
+            (backend, 40000), (backend, 60000), (frontend, 80000)
+        )
+    ]
+
+    medians = crud._internal_median_salaries(db, jobs)
+    assert medians == {
+        jobs[0].id: 60000, jobs[1].id: 60000, jobs[2].id: 90000
+    }
+
+
+def test_get_jobs_by_client_cursor_pagination(db: Session) -> None:
+    client = create_random_client(db)
+    for _ in range(5):
+        job_in = JobCreate(
+            title=random_lower_string(),
+            description=random_lower_string(),
+            client_id=client.id,
+        )
+        crud.create_job(session=db, job_in=job_in)
+
+    page = crud.get_jobs_by_client(
+        session=db, client_id=client.id, skip=0, limit=10
+    )
+    assert page.count == 5
+    assert page.next_cursor is None
+
+    jobs, cursor = [], None
+    while True:
+        next_page = crud.get_jobs_by_client(
+            session=db, client_id=client.id, skip=0, limit=2, cursor=cursor,
+            count_mode=CountModeEnum.none
+        )
+        assert next_page.count is None
+        jobs += next_page.data
+        cursor = next_page.next_cursor
+        if not cursor:
+            break
+    assert [job.id for job in jobs] == [job.id for job in page.data]
+
+
+def test_get_jobs_by_client_cached_count(db: Session) -> None:
+    client = create_random_client(db)
+    job_in = JobCreate(
+        title=random_lower_string(),
+        description=random_lower_string(),
+        client_id=client.id,
+    )
+    crud.create_job(session=db, job_in=job_in)
+
+    page = crud.get_jobs_by_client(
+        session=db, client_id=client.id, skip=0, limit=10,
+        count_mode=CountModeEnum.cached
+    )
+    assert page.count == 1
+    assert page.count_mode == CountModeEnum.cached
+
+    crud.create_job(session=db, job_in=job_in)
+    page = crud.get_jobs_by_client(
+        session=db, client_id=client.id, skip=0, limit=10,
+        count_mode=CountModeEnum.cached
+    )
+    assert len(page.data) == 2
+    assert page.count == 1
+
+
+def test_search_jobs_query_prefix_match(db: Session) -> None:
+    client = create_random_client(db)
+    word = random_lower_string()
+    for title in [f"{word} developer", f"senior {word}", random_lower_string()]:
+        job_in = JobCreate(
+            title=title, description=random_lower_string(), client_id=client.id
+        )
+        crud.create_job(session=db, job_in=job_in)
+
+    page = crud.search_jobs(session=db, filters=JobSearch(query=word[:10]))
+    assert page.count == 2
+    assert {job.title for job in page.data} == {f"{word} developer", f"senior {word}"}
+    assert page.next_cursor is None
+
+
+def test_matching_jobs_use_resume_skills(db: Session) -> None:
+    client = create_random_client(db)
+    title = random_lower_string()
+    skill = random_lower_string()
+    for job_title, required_skills in [
+        (f"{title} engineer", []),
+        # Skills are matched whatever their case
+        (random_lower_string(), [skill.upper()]),
+        (random_lower_string(), []),
+    ]:
+        job_in = JobCreate(
+            title=job_title, description=random_lower_string(),
+            required_skills=required_skills, client_id=client.id
+        )
+        crud.create_job(session=db, job_in=job_in)
+    candidate = crud.create_candidate(
+        session=db, candidate_in=CandidateCreate(
+            email=random_email(), job_titles_of_interest=title
+        )
+    )
+
+    page = crud.get_matching_jobs_for_candidate(
+        session=db, candidate=candidate, skip=0, limit=10
+    )
+    assert [job.title for job in page.data] == [f"{title} engineer"]
+
+    crud.replace_candidate_resume_skills(
+        session=db, candidate_id=candidate.id, skills={skill: 2}
+    )
+    assert crud.get_candidate_resume_skills(
+        session=db, candidate_ids=[candidate.id]
+    ) == {candidate.id: [skill]}
+    page = crud.get_matching_jobs_for_candidate(
+        session=db, candidate=candidate, skip=0, limit=10
+    )
+    assert page.count == 2
+    assert {tuple(job.required_skills) for job in page.data} == {
+        (), (skill.upper(),)
+    }
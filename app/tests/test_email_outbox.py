@@ -0,0 +1,195 @@
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import crud
+from app.core.config import settings
+from app.email_outbox import EmailOutboxWorker, retry_delay
+from app.models import EmailOutbox
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP for smtplib: recipients at reject.example.com are
+    refused, everything else is accepted.
+    """
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.server.connections += 1
+        self.reply("220 fake ESMTP")
+        recipients = []
+        while line := self.rfile.readline().decode().strip():
+            command = line[:4].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 fake")
+            elif command == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                if "@reject.example.com" in line:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(line.split(":", 1)[1].strip(" <>"))
+                    self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.delivered.extend(recipients)
+                self.reply("250 OK")
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeSMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.delivered = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(settings, "SMTP_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_SSL", False)
+    monkeypatch.setattr(settings, "SMTP_USER", None)
+    monkeypatch.setattr(settings, "SMTP_PASSWORD", None)
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "noreply@example.com")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    SQLModel.metadata.create_all(engine, tables=[EmailOutbox.__table__])
+    return engine
+
+
+def _enqueue(engine, *emails_to: str) -> None:
+    with Session(engine) as session:
+        for email_to in emails_to:
+            crud.enqueue_email(
+                session=session, email_to=email_to,
+                subject="Hello", html_content="<p>Hello</p>",
+            )
+
+
+def _outbox(engine) -> dict[str, EmailOutbox]:
+    with Session(engine) as session:
+        return {
+            email.email_to: email
+            for email in session.exec(select(EmailOutbox)).all()
+        }
+
+
+def test_emails_are_sent_in_batches_over_one_connection(
+    smtp_server, engine, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 2)
+    recipients = [f"user{n}@example.com" for n in range(5)]
+    _enqueue(engine, *recipients)
+    worker = EmailOutboxWorker()
+    worker._engine = engine
+
+    assert worker.send_due_emails() == 5
+    assert smtp_server.connections == 1
+    assert sorted(smtp_server.delivered) == recipients
+    outbox = _outbox(engine)
+    assert {email.status for email in outbox.values()} == {"sent"}
+    assert all(email.attempts == 1 and email.sent_at for email in outbox.values())
+
+    # Nothing left to send, no connection is opened
+    assert worker.send_due_emails() == 0
+    assert smtp_server.connections == 1
+
+
+def test_failed_emails_are_retried_with_backoff(
+    smtp_server, engine, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    _enqueue(engine, "bounce@reject.example.com", "ok@example.com")
+    worker = EmailOutboxWorker()
+    worker._engine = engine
+
+    before = datetime.utcnow()
+    assert worker.send_due_emails() == 2
+    outbox = _outbox(engine)
+    assert outbox["ok@example.com"].status == "sent"
+    failed = outbox["bounce@reject.example.com"]
+    assert failed.status == "pending"
+    assert "550" in failed.last_error
+    assert failed.next_attempt_at >= before + timedelta(seconds=retry_delay(1))
+    # Not due yet
+    assert worker.send_due_emails() == 0
+
+    with Session(engine) as session:
+        failed.next_attempt_at = datetime.utcnow()
+        session.add(failed)
+        session.commit()
+    assert worker.send_due_emails() == 1
+    failed = _outbox(engine)["bounce@reject.example.com"]
+    assert (failed.status, failed.attempts) == ("failed", 2)
+    assert smtp_server.delivered == ["ok@example.com"]
+    assert (worker.sent, worker.failed) == (1, 2)
+
+
+def test_emails_of_a_crashed_worker_are_given_up_after_the_last_attempt(
+    smtp_server, engine, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    _enqueue(engine, "crash@example.com")
+    # Claimed for its last attempt by a worker that died while sending it
+    with Session(engine) as session:
+        crud.claim_due_emails(
+            session=session, limit=1, now=datetime.utcnow(),
+            lease_until=datetime.utcnow(), max_attempts=2,
+        )
+        crud.claim_due_emails(
+            session=session, limit=1, now=datetime.utcnow(),
+            lease_until=datetime.utcnow(), max_attempts=2,
+        )
+    worker = EmailOutboxWorker()
+    worker._engine = engine
+
+    assert worker.send_due_emails() == 0
+    email = _outbox(engine)["crash@example.com"]
+    assert (email.status, email.attempts) == ("failed", 2)
+    assert "lease expired" in email.last_error
+    assert smtp_server.delivered == []
+
+def test_worker_wakes_up_when_an_email_is_queued(
+    smtp_server, engine, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_POLL_SECONDS", 60)
+    worker = EmailOutboxWorker()
+    monkeypatch.setattr("app.email_outbox.email_outbox", worker)
+    worker.start(engine)
+    try:
+        _enqueue(engine, "wake@example.com")
+        for _ in range(100):
+            if worker.sent:
+                break
+            time.sleep(0.05)
+    finally:
+        worker.stop(timeout=5)
+    assert smtp_server.delivered == ["wake@example.com"]
+
+
+def test_retry_delay_doubles_up_to_the_maximum(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_RETRY_BASE_SECONDS", 30)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_RETRY_MAX_SECONDS", 100)
+    assert [retry_delay(attempts) for attempts in range(1, 5)] == [30, 60, 100, 100]
@@ -0,0 +1,49 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from PIL import Image
+
+from app.core.storage import LocalStorage
+from app.images import generate_avatar_variants, render_avatar_variants
+
+
+def _png(width: int, height: int) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 10, 10, 128)).save(output, "PNG")
+    return output.getvalue()
+
+
+def test_render_avatar_variants() -> None:
+    rendered = render_avatar_variants(_png(640, 480), "png")
+
+    assert set(rendered) == {
+        "webp", "thumbnail_64", "thumbnail_64_webp",
+        "thumbnail_256", "thumbnail_256_webp",
+    }
+    with Image.open(io.BytesIO(rendered["webp"])) as image:
+        assert (image.format, image.size) == ("WEBP", (640, 480))
+    with Image.open(io.BytesIO(rendered["thumbnail_64"])) as image:
+        assert (image.format, image.size) == ("PNG", (64, 64))
+    with Image.open(io.BytesIO(rendered["thumbnail_256_webp"])) as image:
+        assert (image.format, image.size) == ("WEBP", (256, 256))
+
+
+def test_generate_avatar_variants_stores_them_once(tmp_path) -> None:
+    storage = LocalStorage(str(tmp_path))
+    key = "avatar/ab/abc.png"
+    (tmp_path / "avatar" / "ab").mkdir(parents=True)
+    (tmp_path / key).write_bytes(_png(100, 100))
+
+    with patch("app.images.storage", storage), \
+            patch("app.images._image_executor", lambda: ThreadPoolExecutor(1)), \
+            patch("app.images.render_avatar_variants",
+                  wraps=render_avatar_variants) as render:
+        variants = asyncio.run(generate_avatar_variants(key))
+        assert asyncio.run(generate_avatar_variants(key)) == variants
+
+    assert render.call_count == 1
+    assert variants["thumbnail_64"] == "uploads/avatar/ab/abc_thumbnail_64.png"
+    assert variants["webp"] == "uploads/avatar/ab/abc_webp.webp"
+    assert (tmp_path / "avatar" / "ab" / "abc_thumbnail_256_webp.webp").exists()
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+from app.reference_data import AutocompleteIndex, ReferenceData, SkillCoefficients
+
+
+def make_index(*names: str) -> AutocompleteIndex:
+    return AutocompleteIndex((name, name) for name in names)
+
+
+def test_autocomplete_ranks_exact_then_prefix_then_substring() -> None:
+    index = make_index("Java", "JavaScript", "Scala", "Java EE", "Kotlin")
+    assert index.search("java", 10) == ["Java", "Java EE", "JavaScript"]
+    assert index.search("sc", 10) == ["Scala", "JavaScript"]
+
+
+def test_autocomplete_prefers_word_starts_among_substrings() -> None:
+    index = make_index("New York", "Newark", "Yorkshire Dales", "East Yorkville")
+    assert index.search("york", 10) == [
+        "Yorkshire Dales", "New York", "East Yorkville"
+    ]
+
+
+def test_autocomplete_respects_limit_and_ignores_case() -> None:
+    index = make_index("Python", "PyTorch", "Pyramid", "Spy")
+    assert index.search("PY", 2) == ["Python", "Pyramid"]
+    assert index.search("py", 0) == []
+    assert index.search("  ", 5) == []
+
+
+def test_autocomplete_no_match() -> None:
+    index = make_index("Go", "Rust")
+    assert index.search("haskell", 5) == []
+
+
+def test_reference_data_lookups_count_hits_and_misses() -> None:
+    data = ReferenceData()
+    data.skill_coefficients = {"Python": SkillCoefficients(1.3, 3000)}
+    data.location_multipliers = {"Austin": 1.2}
+
+    assert data.skill("Python") == SkillCoefficients(1.3, 3000)
+    assert data.location_multiplier("Austin") == 1.2
+    assert data.location_multiplier("Paris") is None
+    assert data.industry_trend("Fintech") is None
+    assert data.stats()["hits"] == 2
+    assert data.stats()["misses"] == 2
+
+
+def test_cold_start_loads_outside_the_event_loop(monkeypatch) -> None:
+    data = ReferenceData()
+    data._engine = object()
+    loop_thread = threading.get_ident()
+    reload_threads = []
+
+    def reload() -> None:
+        reload_threads.append(threading.get_ident())
+        data._loaded_version = data._version
+        data._loaded_at = time.monotonic()
+
+    monkeypatch.setattr(data, "reload", reload)
+
+    async def search() -> list[str]:
+        await data.ensure_fresh_async()
+        return data.search_skills("py", 5)
+
+    assert asyncio.run(search()) == []
+    assert len(reload_threads) == 1 and reload_threads[0] != loop_thread
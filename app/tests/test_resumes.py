@@ -0,0 +1,65 @@
+import io
+import zipfile
+
+from app.resumes import count_skills, extract_resume_text
+
+SKILLS = ("Java", "JavaScript", "C++", "C", "Machine Learning", "Node.js")
+
+
+def _docx(*paragraphs: str) -> bytes:
+    body = "".join(
+        f"<w:p><w:r><w:t>{paragraph}</w:t></w:r></w:p>" for paragraph in paragraphs
+    )
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as docx:
+        docx.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+            f'wordprocessingml/2006/main"><w:body>{body}</w:body></w:document>',
+        )
+    return output.getvalue()
+
+
+def _pdf(text: str) -> bytes:
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, content in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, content)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF" % (
+        len(objects) + 1, xref
+    )
+    return pdf
+
+
+def test_count_skills() -> None:
+    text = (
+        "Senior JavaScript and Node.js developer, some Java and C++.\n"
+        "Machine\nlearning with java, not javanese. C is fine."
+    )
+
+    assert count_skills(text, SKILLS) == {
+        "JavaScript": 1, "Node.js": 1, "Java": 2, "C++": 1,
+        "Machine Learning": 1, "C": 1,
+    }
+    assert count_skills(text, ()) == {}
+
+
+def test_extract_resume_text() -> None:
+    text = extract_resume_text(_docx("Python developer", "Machine Learning"), "docx")
+    assert text == "Python developer\nMachine Learning"
+
+    assert "Java and C++" in extract_resume_text(_pdf("Java and C++"), "pdf")
+    assert extract_resume_text(b"", "jpg") == ""
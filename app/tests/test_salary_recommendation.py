@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from app.salary_recommendation import (
+    MarketContext, SkillInput, calculate_final_salary,
+    calculate_market_components, recommend_salaries, recommend_salary
+)
+
+
+def test_calculate_final_salary_wraps_recommend_salary() -> None:
+    context = MarketContext(
+        internal_median=85000, location_multiplier=1.1, trend_percentage=3
+    )
+    skills = [SkillInput(4, 1.3, 3000), SkillInput(3, 1.1, 2500)]
+
+    recommendation = recommend_salary(context, skills)
+
+    assert recommendation.final_salary == pytest.approx(calculate_final_salary(
+        85000, 0.4, 52000, 0.5, [4, 3], [1.3, 1.1], [3000, 2500],
+        1.1, 3, 5000, 0.1, 5, 10000, 4, 0.02,
+        4, 2000, 3, 1500, 3000, 1.05, 1.03
+    ))
+    assert recommendation.components["skill_premium"] == pytest.approx(
+        4 * 1.3 * 3000 + 3 * 1.1 * 2500
+    )
+    assert recommendation.subtotal == pytest.approx(
+        sum(recommendation.components.values())
+    )
+
+
+def test_recommend_salaries_matches_recommend_salary() -> None:
+    austin = MarketContext(
+        internal_median=60000, location_multiplier=1.2, trend_percentage=4
+    )
+    boston = MarketContext(
+        internal_median=60000, location_multiplier=1.4, trend_percentage=4
+    )
+    contexts = [austin, boston, austin]
+    skills = [
+        [SkillInput(4, 1.3, 3000), SkillInput(3, 1.1, 2500), SkillInput(5, 1.5, 4000)],
+        [SkillInput(2, 1.0, 2500)],
+        [SkillInput(5, 1.2, 3500)],
+    ]
+
+    calculate_market_components.cache_clear()
+    recommendations = recommend_salaries(contexts, skills)
+    # Components are calculated once per distinct context
+    info = calculate_market_components.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+    for context, candidate_skills, recommendation in zip(
+        contexts, skills, recommendations
+    ):
+        assert recommendation.final_salary == pytest.approx(
+            recommend_salary(context, candidate_skills).final_salary
+        )
+
+
+def test_recommend_salaries_of_thousands_of_candidates() -> None:
+    contexts = [
+        MarketContext(
+            internal_median=50000 + 1000 * (n % 20),
+            location_multiplier=1.1, trend_percentage=3,
+        )
+        for n in range(5000)
+    ]
+    skills = [
+        [SkillInput(1 + n % 5, 1.2, 2000 + 100 * k) for k in range(n % 12)]
+        for n in range(5000)
+    ]
+
+    start = time.perf_counter()
+    recommendations = recommend_salaries(contexts, skills)
+    assert time.perf_counter() - start < 1
+
+    assert len(recommendations) == 5000
+    assert recommendations[0].components["skill_premium"] == 0
+    for n in (1, 11, 4999):
+        assert recommendations[n].final_salary == pytest.approx(
+            recommend_salary(contexts[n], skills[n]).final_salary
+        )
@@ -0,0 +1,18 @@
+from app.search import search_document_sql, text_search
+
+
+def test_search_document_labels_columns_by_weight() -> None:
+    document = search_document_sql(("title", "body"), "job", weights=(2, 1))
+    assert document == (
+        "(setweight(to_tsvector('simple'::regconfig, coalesce(job.title, '')), 'A')"
+        " || setweight(to_tsvector('simple'::regconfig, coalesce(job.body, '')), 'B'))"
+    )
+
+
+def test_postgres_rank_uses_the_column_weights() -> None:
+    from app.models import Job
+
+    _, rank = text_search(
+        "postgresql", [Job.title, Job.location], "python", weights=(2, 1)
+    )
+    assert "'{0.0, 0.0, 0.5, 1.0}'::float4[]" in str(rank)
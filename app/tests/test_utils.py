@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+import io
+import os
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.storage import LocalStorage
+from app.utils import RequestSizeLimitMiddleware, save_file
+
+
+def _upload(content: bytes, filename: str = "resume.pdf") -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=filename)
+
+
+def test_save_file_streams_and_hashes(tmp_path) -> None:
+    storage = LocalStorage(str(tmp_path))
+    content = os.urandom(3 * 1024 * 1024 + 1)
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    with patch("app.utils.storage", storage):
+        saved = asyncio.run(save_file(_upload(content), "resumes"))
+        again = asyncio.run(save_file(_upload(content, "copy.pdf"), "resumes"))
+
+    assert saved.key == f"resumes/{sha256[:2]}/{sha256}.pdf"
+    assert saved.url == f"uploads/{saved.key}"
+    assert saved.size == len(content)
+    assert saved.sha256 == sha256
+    assert again == saved
+    assert open(storage.path(saved.key), "rb").read() == content
+    assert os.listdir(tmp_path / ".staging") == []
+
+
+def test_save_file_rejects_large_files(tmp_path) -> None:
+    storage = LocalStorage(str(tmp_path))
+
+    with patch("app.utils.storage", storage), \
+            patch("app.utils.settings.MAX_UPLOAD_SIZE_BYTES", 10):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(save_file(_upload(b"x" * 11), "resumes"))
+
+    assert exc_info.value.status_code == 413
+    assert os.listdir(tmp_path / ".staging") == []
+    assert not os.path.exists(tmp_path / "resumes")
+
+
+def test_save_file_rejects_extension() -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(save_file(_upload(b"x", "run.exe"), "resumes"))
+
+    assert exc_info.value.status_code == 400
+
+
+def test_save_file_rejects_missing_filename() -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(save_file(UploadFile(io.BytesIO(b"x")), "resumes"))
+
+    assert exc_info.value.status_code == 400
+
+
+def test_large_requests_are_rejected_before_reading_the_body() -> None:
+    received = []
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile) -> int:
+        received.append(file.filename)
+        return file.size
+
+    client = TestClient(app)
+    with patch("app.utils.settings.MAX_REQUEST_SIZE_BYTES", 1000):
+        response = client.post("/upload", files={"file": ("a.pdf", b"x" * 2000)})
+        assert response.status_code == 413
+        assert received == []
+
+        response = client.post("/upload", files={"file": ("a.pdf", b"x" * 500)})
+        assert response.json() == 500
@@ -1,7 +1,11 @@
+import base64
+import hashlib
 import logging
 import os
 import json
 from fastapi import UploadFile, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
@@ -15,6 +19,7 @@ from jwt.exceptions import InvalidTokenError
 
 from app.core import security
 from app.core.config import settings
+from app.core.storage import content_key, storage
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,19 +39,15 @@ def render_email_template(*, template_name: str, context: dict[str, Any]) -> str
     return html_content
 
 
-def send_email(
-    *,
-    email_to: str,
-    subject: str = "",
-    html_content: str = "",
-) -> None:
-    assert settings.emails_enabled, "no provided configuration for email variables"
-    message = emails.Message(
+def email_message(*, subject: str = "", html_content: str = "") -> emails.Message:
+    return emails.Message(
         subject=subject,
         html=html_content,
         mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
     )
-    print(html_content)
+
+
+def smtp_options() -> dict[str, Any]:
     smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
     if settings.SMTP_TLS:
         smtp_options["tls"] = True
@@ -56,7 +57,22 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    return smtp_options
+
+
+def send_email(
+    *,
+    email_to: str,
+    subject: str = "",
+    html_content: str = "",
+) -> None:
+    """
+    Sends an email right away, over a new SMTP connection. Routes queue
+    their emails with `crud.enqueue_email` instead, see app/email_outbox.py.
+    """
+    assert settings.emails_enabled, "no provided configuration for email variables"
+    message = email_message(subject=subject, html_content=html_content)
+    response = message.send(to=email_to, smtp=smtp_options())
     logger.info(f"send email result: {response}")
 
 
@@ -128,34 +144,110 @@ def verify_password_reset_token(token: str) -> str | None:
         return None
 
 
-async def save_file(
-    file_name: str, file: UploadFile, folder: str
-) -> str:
+@dataclass
+class SavedFile:
+    key: str
+    url: str
+    size: int
+    sha256: str
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _write_chunk(out, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+
+async def save_file(file: UploadFile, folder: str) -> SavedFile:
+    """
+    Streams the upload to a staging file one chunk at a time, hashing it on
+    the way, then stores it in `storage` under its content hash. Identical
+    files share one blob, which is only written once. Uploads over
+    MAX_UPLOAD_SIZE_BYTES are rejected.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="File name is missing")
+    # Validate file extension
+    file_extension = file.filename.split('.')[-1].lower()
+    allowed_extensions = {"jpg", "png", "pdf", "docx"}
+    if file_extension not in allowed_extensions:
+        raise HTTPException(
+            status_code=400, detail=f"File type {file_extension} is not allowed"
+        )
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE_BYTES:
+        raise _file_too_large()
+
+    temporary_path = None
     try:
-        # Validate file extension
-        file_extension = file.filename.split('.')[-1].lower()
-        allowed_extensions = {"jpg", "png", "pdf", "docx"}
-        if file_extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=400, detail=f"File type {file_extension} is not allowed"
-            )
-
-        # Define the file path
-        file_id = f"{file_name}.{file_extension}"
-        file_path = os.path.join("uploads", folder, file_id)
-
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-
-        return file_path
+        temporary_path = await run_in_threadpool(storage.staging_path)
+
+        digest = hashlib.sha256()
+        size = 0
+        out = await run_in_threadpool(open, temporary_path, "wb")
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE_BYTES:
+                    raise _file_too_large()
+                await run_in_threadpool(_write_chunk, out, digest, chunk)
+        finally:
+            await run_in_threadpool(out.close)
+
+        key = content_key(folder, digest.hexdigest(), file_extension)
+        await run_in_threadpool(storage.put, key, temporary_path)
+        return SavedFile(
+            key=key, url=storage.url(key), size=size, sha256=digest.hexdigest()
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Invalid file, unable to save: {str(e)}"
         )
+    finally:
+        if temporary_path and os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def _file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File is larger than {settings.MAX_UPLOAD_SIZE_BYTES} bytes",
+    )
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Rejects requests declaring a Content-Length over MAX_REQUEST_SIZE_BYTES
+    before their body is read. Starlette spools multipart uploads to disk
+    before the routes run, so `save_file` can only reject a large file once
+    it was received. Chunked requests, without a Content-Length, still are
+    only limited by `save_file`.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http":
+            content_length = dict(scope["headers"]).get(b"content-length")
+            if (
+                content_length is not None
+                and content_length.isdigit()
+                and int(content_length) > settings.MAX_REQUEST_SIZE_BYTES
+            ):
+                response = JSONResponse(
+                    status_code=413,
+                    content={
+                        "detail": "Request is larger than "
+                        f"{settings.MAX_REQUEST_SIZE_BYTES} bytes"
+                    },
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
 
 
 # Helper function to safely parse JSON strings
@@ -166,3 +258,20 @@ def parse_json_string_field(field: str, field_name: str):
         raise HTTPException(
             status_code=400, detail=f"Invalid JSON for {field_name}"
         )
+
+
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    """
+    Opaque keyset pagination cursor pointing at a (created_at, id) row.
+    """
+    raw = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -11,3 +11,6 @@ alembic upgrade head
 
 # Create initial data in DB
 python app/initial_data.py
+
+# Rebuild the market insights rollups from the job table
+python app/refresh_market_insights.py